@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# Offline throughput benchmark for the ingestion pipeline.
+#
+# Starts a fake llama.cpp-style completion server and an HTTP fixture server
+# with a synthetic corpus, points llm_bot at a throwaway data directory and
+# times each stage end to end. Example:
+#
+#     python3 bench.py --docs 200 --llm-latency 0.05 --tps 200 --json out.json
+#     python3 bench.py --baseline out.json        # fail on >20% docs/sec drop
+import argparse
+import functools
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Streamed answers include one multi-byte token, sent as raw UTF-8 like
+# llama.cpp, so a client decoding the stream with the wrong charset fails.
+STREAM_TOKEN = " café — naïve ✓"
+WORDS = ("kernel socket packet route cipher key token buffer signal thread process daemon config "
+         "network firewall journal service unit mount device driver memory cache index query file").split()
+
+@functools.lru_cache(maxsize=None)
+def synthetic_text(seed, size):
+    rng = random.Random(seed)
+    paras, total = [], 0
+    while total < size:
+        para = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))).capitalize() + "."
+        if rng.random() < 0.1:
+            para += "\n\n```bash\nsystemctl status " + rng.choice(WORDS) + "\n```"
+        paras.append(para)
+        total += len(para) + 2
+    return "\n\n".join(paras)[:size]
+
+@functools.lru_cache(maxsize=None)
+def synthetic_html(seed, size):
+    body = "".join(f"<p>{p}</p>\n" for p in synthetic_text(seed, size).split("\n\n"))
+    return (f"<html><head><title>Doc {seed}</title><style>p {{ color: black }}</style>"
+            f"<script>var x = {seed};</script></head><body><nav>Home | Docs</nav>"
+            f"<main>{body}</main><footer>footer</footer></body></html>")
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body, content_type, headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+# Hashed bag-of-words vector: texts sharing words get similar embeddings.
+def embedding(text, dim=64):
+    vec = [0.0] * dim
+    for word in text.lower().split():
+        vec[zlib.crc32(word.encode("utf-8")) % dim] += 1.0
+    return vec
+
+# Mimics the llama.cpp /completion contract: JSON {"content": ...} or, with
+# "stream": true, chunked server-sent events ending in a "stop": true event.
+# Array json_schema requests get a valid array of the schema's labels and
+# /v1/embeddings requests get embedding() vectors.
+# `latency` is time to first token, `tps` the generation rate.
+def make_llm_handler(latency, tps, max_tokens):
+    class LLMHandler(QuietHandler):
+        def do_POST(self):
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.endswith("/embeddings"):
+                time.sleep(latency)
+                data = [{"index": i, "embedding": embedding(text)} for i, text in enumerate(req.get("input", []))]
+                self.send_body(200, json.dumps({"data": data}), "application/json")
+                return
+            n = min(int(req.get("n_predict", 16)), max_tokens)
+            # Different prompts get different answers, as summaries would.
+            seed = zlib.crc32(req.get("prompt", "").encode("utf-8"))
+            tokens = [" " + WORDS[(seed + i * i) % len(WORDS)] for i in range(n)]
+            time.sleep(latency)
+            schema = req.get("json_schema")
+            if schema and schema.get("type") == "array":
+                # Constrained output: one allowed label per requested item.
+                labels = schema["items"]["enum"]
+                content = json.dumps([labels[i % len(labels)] for i in range(schema["minItems"])])
+                time.sleep(len(content) / 4 / tps)
+                self.send_body(200, json.dumps({"content": content}), "application/json")
+                return
+            if not req.get("stream"):
+                time.sleep(n / tps)
+                self.send_body(200, json.dumps({"content": "".join(tokens), "tokens_predicted": n}),
+                               "application/json")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, tok in enumerate(tokens[:1] + [STREAM_TOKEN] + tokens[1:] + [""]):
+                if i:
+                    time.sleep(1 / tps)
+                event = json.dumps({"content": tok, "stop": not tok}, ensure_ascii=False)
+                event = f"data: {event}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+    return LLMHandler
+
+# Serves /doc/<n>.html and /doc/<n>.txt of roughly `size` bytes each, with
+# an ETag so repeat fetches can be answered with 304 Not Modified.
+def make_fixture_handler(size):
+    class FixtureHandler(QuietHandler):
+        def do_GET(self):
+            name = self.path.rsplit("/", 1)[-1]
+            stem, _, ext = name.partition(".")
+            if not stem.isdigit() or ext not in ("html", "txt"):
+                self.send_body(404, "not found", "text/plain")
+                return
+            etag = f'"{name}-{size}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+            elif ext == "txt":
+                self.send_body(200, synthetic_text(int(stem), size), "text/plain; charset=utf-8", [("ETag", etag)])
+            else:
+                self.send_body(200, synthetic_html(int(stem), size), "text/html; charset=utf-8", [("ETag", etag)])
+    return FixtureHandler
+
+class BenchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at shutdown is expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def serve(handler):
+    server = BenchServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Records the duration of every call to obj.name for the latency columns.
+def timed(obj, name, samples):
+    original = getattr(obj, name)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    setattr(obj, name, wrapper)
+
+# A request failing with something other than a transport error (here a
+# backend URL without a scheme) must still give its slot back, or later
+# requests wait forever.
+def check_slot_release(llm_bot):
+    client = llm_bot.LLMClient(backends=[llm_bot.LLMBackend("localhost:8080", parallel=1)], cache=False)
+    try:
+        client.complete("ping")
+    except Exception:
+        pass
+    if client.pool.backends[0].inflight:
+        raise RuntimeError("LLM backend slot leaked by a failed request")
+
+# Inserting a paragraph into a summarized document may only send the chunk
+# holding it, a neighbour whose boundary moved and the combine prompts above
+# them back to the LLM, not every chunk after the insertion.
+def check_incremental_summary(llm_bot):
+    summaries = llm_bot.ChunkSummaries(llm_bot.DATA_ROOT / "bench-summaries.db")
+    client = llm_bot.llm_client()
+    paras = synthetic_text(-1, 120000).split("\n\n")
+    try:
+        llm_bot.summarize_document("\n\n".join(paras), client, summaries=summaries, doc="bench")
+        paras.insert(len(paras) // 3, synthetic_text(-2, 400))
+        text = "\n\n".join(paras)
+        summaries.hits = summaries.misses = 0
+        _, calls, _ = llm_bot.summarize_document(text, client, summaries=summaries, doc="bench")
+        chunks = len(llm_bot.section_chunks(text))
+    finally:
+        summaries.close()
+    if summaries.misses > 2 + calls - chunks:
+        raise RuntimeError(f"summarize: inserting a paragraph re-ran {summaries.misses} of {calls} prompts "
+                           f"({chunks} chunks)")
+
+# Every document classify marked done must be listed by `llm_bot.py labels`,
+# packed documents included.
+def check_labels(llm_bot):
+    manifest = llm_bot.Manifest()
+    try:
+        done = {path for (path,) in manifest.db.execute("SELECT path FROM stages WHERE stage = 'classify'")}
+        missing = done - {path for path, _, _ in manifest.labels()}
+    finally:
+        manifest.close()
+    if missing:
+        raise RuntimeError(f"classify: {len(missing)} labelled documents missing from labels(), e.g. {min(missing)}")
+
+def run_benchmark(opts):
+    data_root = tempfile.mkdtemp(prefix="llmfeed-bench-")
+    # llm_bot reads its configuration at import time.
+    os.environ["LLMFEED_DATA_ROOT"] = data_root
+    os.environ["LLMFEED_HOST_DELAY"] = str(opts.host_delay)
+    os.environ["LLMFEED_LLM_PARALLEL"] = str(opts.parallel)
+    os.environ["LLMFEED_PACK"] = "1" if opts.pack else "0"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import llm_bot
+
+    check_slot_release(llm_bot)
+    # One fake completion server per backend, each given --parallel slots.
+    llm_servers = [serve(make_llm_handler(opts.llm_latency, opts.tps, opts.max_tokens))
+                   for _ in range(max(1, opts.backends))]
+    # One fixture server per simulated host: the fetch engine keeps one
+    # request in flight per host:port, as it would against real sites.
+    fixture_servers = [serve(make_fixture_handler(opts.doc_bytes)) for _ in range(max(1, opts.hosts))]
+    for i in range(opts.docs):
+        (synthetic_text if i % 2 else synthetic_html)(i, opts.doc_bytes)
+    llm_bot.ensure_data_root()
+    llm_bot._llm_client = llm_bot.LLMClient(backends=[
+        llm_bot.LLMBackend(f"http://127.0.0.1:{srv.server_address[1]}", opts.parallel) for srv in llm_servers])
+    ports = [srv.server_address[1] for srv in fixture_servers]
+    urls = [f"http://127.0.0.1:{ports[i % len(ports)]}/doc/{i}.{'txt' if i % 2 else 'html'}" for i in range(opts.docs)]
+
+    samples = []
+    timed(llm_bot.LLMClient, "complete_cached", samples)
+    timed(llm_bot.FetchEngine, "_fetch_one", samples)
+    stages = {
+        "fetch": lambda: llm_bot.run_fetch(urls),
+        "refetch": lambda: llm_bot.run_fetch(urls),
+        "summarize": llm_bot.run_summarize,
+        "classify": llm_bot.run_classify,
+        "index": llm_bot.run_index,
+        "extract": llm_bot.run_extract_code,
+        "embed": llm_bot.run_embed,
+        "search": lambda: llm_bot.search("which service unit handles the network firewall?"),
+        "ask": lambda: llm_bot.ask("which service unit handles the network firewall?", stream=True),
+    }
+    results = []
+    try:
+        for name in opts.stages:
+            samples.clear()
+            start = time.perf_counter()
+            outcome = stages[name]()
+            elapsed = time.perf_counter() - start
+            if name == "ask" and STREAM_TOKEN not in outcome[0]:
+                raise RuntimeError(f"ask: streamed answer lost its UTF-8 token: {outcome[0][:80]!r}")
+            if name == "summarize":
+                check_incremental_summary(llm_bot)
+            if name == "classify":
+                check_labels(llm_bot)
+            docs = 1 if name in ("ask", "search") else opts.docs
+            results.append({
+                "stage": name,
+                "seconds": round(elapsed, 3),
+                "docs_per_sec": round(docs / elapsed, 2) if elapsed else None,
+                "p50_ms": None if not samples else round(percentile(samples, 50) * 1000, 1),
+                "p95_ms": None if not samples else round(percentile(samples, 95) * 1000, 1),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "result": outcome[1] if isinstance(outcome, tuple) else outcome,
+            })
+            if opts.verbose:
+                print(f"  {name}: {results[-1]['result']}", file=sys.stderr)
+        if opts.verbose:
+            print(llm_bot.metrics_report(llm_bot.metrics.snapshot()), file=sys.stderr)
+    finally:
+        for srv in [*llm_servers, *fixture_servers]:
+            srv.shutdown()
+        if opts.keep:
+            print(f"[i] Data kept in {data_root}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_root, ignore_errors=True)
+    return results
+
+def print_table(results):
+    print(f"{'stage':<10} {'seconds':>9} {'docs/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>9}")
+    for r in results:
+        cells = [r["seconds"], r["docs_per_sec"], r["p50_ms"], r["p95_ms"], r["peak_rss_mb"]]
+        print(f"{r['stage']:<10} " + " ".join(f"{'-' if c is None else c:>9}" for c in cells))
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["stage"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get(r["stage"])
+        if old and old["docs_per_sec"] and r["docs_per_sec"] is not None:
+            if r["docs_per_sec"] < old["docs_per_sec"] * (1 - tolerance):
+                regressions.append(f"{r['stage']}: {r['docs_per_sec']} docs/s vs baseline {old['docs_per_sec']}")
+    return regressions
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the LLM Feed Bot pipeline against local fake servers.")
+    p.add_argument("--docs", type=int, default=100, help="documents in the synthetic corpus (default 100)")
+    p.add_argument("--doc-bytes", type=int, default=20000, help="approximate size of each document (default 20000)")
+    p.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM time to first token in seconds")
+    p.add_argument("--tps", type=float, default=500.0, help="fake LLM tokens per second per request")
+    p.add_argument("--max-tokens", type=int, default=64, help="cap on tokens generated per request")
+    p.add_argument("--parallel", type=int, default=4, help="LLM requests in flight per backend (LLMFEED_LLM_PARALLEL)")
+    p.add_argument("--backends", type=int, default=1, help="fake LLM servers to balance across (default 1)")
+    p.add_argument("--hosts", type=int, default=8, help="fixture servers, each counted as a separate host (default 8)")
+    p.add_argument("--pack", action="store_true", help="store documents in the packed corpus (LLMFEED_PACK=1)")
+    p.add_argument("--host-delay", type=float, default=0.0, help="per-host fetch delay (LLMFEED_HOST_DELAY)")
+    p.add_argument("--stages", default="fetch,refetch,summarize,classify,index,extract,embed,search,ask",
+                   help="comma-separated stages to run, in order (refetch repeats fetch against the HTTP cache)")
+    p.add_argument("--json", help="write results to this JSON file")
+    p.add_argument("--baseline", help="JSON from an earlier run; exit 1 if docs/sec regresses")
+    p.add_argument("--tolerance", type=float, default=0.2, help="allowed docs/sec drop vs baseline (default 0.2)")
+    p.add_argument("--keep", action="store_true", help="keep the temporary data directory")
+    p.add_argument("-v", "--verbose", action="store_true", help="print each stage's status line")
+    opts = p.parse_args(argv)
+    opts.stages = [s.strip() for s in opts.stages.split(",") if s.strip()]
+
+    results = run_benchmark(opts)
+    print_table(results)
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump({"options": {k: v for k, v in vars(opts).items() if k not in ("json", "baseline")},
+                       "results": results}, f, indent=2)
+    if opts.baseline:
+        regressions = compare(results, opts.baseline, opts.tolerance)
+        for line in regressions:
+            print(f"[✗] Regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,98 +6,2043 @@ import json
 import subprocess
 import sqlite3
 import re
+import hashlib
+import heapq
+import gzip
+import math
+import mmap
+import struct
+import zlib
+import fnmatch
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from urllib import robotparser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from xml.etree import ElementTree
+import argparse
+import codecs
+import signal
+from html.parser import HTMLParser
 from pathlib import Path
-from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QTextEdit, QTabWidget, QMessageBox, QLabel, QComboBox
-)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QFont
 import requests
-from bs4 import BeautifulSoup
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
-# Use user-writable directory (XDG compliant)
-DATA_ROOT = Path.home() / ".local" / "share" / "llmfeed"
-DATA_ROOT.mkdir(parents=True, exist_ok=True)
+# Use user-writable directory (XDG compliant). Created by main(), not on import.
+DATA_ROOT = Path(os.environ.get("LLMFEED_DATA_ROOT") or Path.home() / ".local" / "share" / "llmfeed")
 (LLM_URL := "http://127.0.0.1:8080/completion")
+FETCH_CONCURRENCY = int(os.environ.get("LLMFEED_FETCH_CONCURRENCY", "8"))
+HOST_DELAY = float(os.environ.get("LLMFEED_HOST_DELAY", "1.0"))
+HOST_CONCURRENCY = int(os.environ.get("LLMFEED_HOST_CONCURRENCY", "1"))
+USER_AGENT = "LLMFeedBot"
+# Match the server's parallel slots (llama.cpp -np) so every slot stays busy.
+LLM_PARALLEL = int(os.environ.get("LLMFEED_LLM_PARALLEL", "4"))
+LLM_TIMEOUT = float(os.environ.get("LLMFEED_LLM_TIMEOUT", "120"))
+LLM_RETRIES = int(os.environ.get("LLMFEED_LLM_RETRIES", "4"))
+EMBED_URL = os.environ.get("LLMFEED_EMBED_URL", "")
+LLM_MODEL = os.environ.get("LLMFEED_LLM_MODEL", "")
+LLM_BACKENDS = os.environ.get("LLMFEED_LLM_BACKENDS", "")
+LLM_HEALTH_INTERVAL = float(os.environ.get("LLMFEED_LLM_HEALTH_INTERVAL", "15"))
+LLM_CACHE = os.environ.get("LLMFEED_LLM_CACHE", "1") != "0"
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLMFEED_LLM_CACHE_MAX_BYTES", str(64 << 20)))
+LLM_CACHE_DAYS = float(os.environ.get("LLMFEED_LLM_CACHE_DAYS", "30"))
+MAX_PAGE_BYTES = int(os.environ.get("LLMFEED_MAX_PAGE_BYTES", str(8 << 20)))
+HTTP_CACHE = os.environ.get("LLMFEED_HTTP_CACHE", "1") != "0"
+HTTP_CACHE_TTL = float(os.environ.get("LLMFEED_HTTP_CACHE_TTL", "0"))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("LLMFEED_HTTP_CACHE_MAX_BYTES", str(512 << 20)))
+METRICS_TRACE = os.environ.get("LLMFEED_TRACE", "")
 
-class WebWorker(QThread):
-    progress = pyqtSignal(str)
-    finished = pyqtSignal()
-    def __init__(self, urls):
-        super().__init__()
-        self.urls = urls
-        self._running = True
-    def run(self):
-        for url in self.urls:
-            if not self._running:
-                break
-            self.progress.emit(f"[→] Fetching {url}")
-            try:
-                r = requests.get(url, timeout=10, headers={"User-Agent": "LLMFeedBot"})
-                if r.status_code == 200:
-                    content_type = r.headers.get('content-type', '').lower()
-                    if 'text/plain' in content_type or url.endswith('.txt'):
-                        text = r.text
-                    else:
-                        soup = BeautifulSoup(r.text, "html.parser")
-                        text = soup.get_text()
-                    name = "".join(c if c.isalnum() or c in "._-" else "_" for c in url[-50:])
-                    (DATA_ROOT / f"{name}.txt").write_text(text, encoding="utf-8")
-                    self.progress.emit(f"[✓] Saved {name}.txt")
-                else:
-                    self.progress.emit(f"[✗] HTTP {r.status_code}")
-            except Exception as e:
-                self.progress.emit(f"[✗] Error: {str(e)}")
-            time.sleep(1)
-        self.finished.emit()
-    def stop(self):
-        self._running = False
-
-class PresetWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self, fetch_func):
-        super().__init__()
-        self.fetch_func = fetch_func
-        self._running = True
-    def run(self):
-        if not self._running:
+def ensure_data_root():
+    DATA_ROOT.mkdir(parents=True, exist_ok=True)
+    return DATA_ROOT
+
+def _noop(*args):
+    pass
+
+def _always():
+    return True
+
+# Process-wide pipeline metrics: counters and timings keyed by name and
+# labels, e.g. fetch_seconds{host=...} or errors_total{stage=..., type=...}.
+# snapshot() is what the dashboard, `llm_bot.py metrics` and the Prometheus
+# export read. With a trace file (LLMFEED_TRACE) every fetch, LLM request and
+# job is also appended to it as one JSON line.
+class Metrics:
+    def __init__(self, trace=METRICS_TRACE):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.timings = {}
+        self._trace = None
+        self.trace_to(trace)
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            t = self.timings.setdefault(key, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    # Errors are counted by stage and by exception class (or a given kind
+    # such as "HTTP 503").
+    def error(self, stage, kind):
+        self.inc("errors_total", stage=stage, type=kind if isinstance(kind, str) else type(kind).__name__)
+
+    def trace_to(self, path):
+        with self._lock:
+            if self._trace:
+                self._trace.close()
+            self._trace = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    def event(self, kind, /, **fields):
+        if self._trace is None:
             return
+        line = json.dumps({"ts": round(time.time(), 3), "event": kind, **fields})
+        with self._lock:
+            if self._trace:
+                self._trace.write(line + "\n")
+
+    def snapshot(self):
+        with self._lock:
+            return {"started": self.started, "time": time.time(),
+                    "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                    "timings": [[name, dict(labels), *t] for (name, labels), t in self.timings.items()]}
+
+    # Writes the snapshot (metrics.json) and its Prometheus text form
+    # (metrics.prom, for node_exporter's textfile collector) atomically.
+    def save(self, root=None):
+        root = Path(root or DATA_ROOT)
+        snap = self.snapshot()
+        for name, text in (("metrics.json", json.dumps(snap)), ("metrics.prom", prometheus_text(snap))):
+            tmp = root / f".{name}.tmp"
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, root / name)
+        return root / "metrics.prom"
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.timings.clear()
+
+metrics = Metrics()
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in sorted(labels.items())) + "}"
+
+# Prometheus text exposition format: counters as llmfeed_<name>, timings as
+# summaries (_count, _sum) plus a llmfeed_<name>_max gauge.
+def prometheus_text(snapshot):
+    lines = []
+    counters, timings = {}, {}
+    for name, labels, value in snapshot["counters"]:
+        counters.setdefault(name, []).append((labels, value))
+    for name, labels, count, total, peak in snapshot["timings"]:
+        timings.setdefault(name, []).append((labels, count, total, peak))
+    for name in sorted(counters):
+        lines.append(f"# TYPE llmfeed_{name} counter")
+        lines += [f"llmfeed_{name}{_prom_labels(labels)} {value}" for labels, value in counters[name]]
+    for name in sorted(timings):
+        lines.append(f"# TYPE llmfeed_{name} summary")
+        for labels, count, total, _ in timings[name]:
+            lines.append(f"llmfeed_{name}_count{_prom_labels(labels)} {count}")
+            lines.append(f"llmfeed_{name}_sum{_prom_labels(labels)} {total:.6f}")
+        lines.append(f"# TYPE llmfeed_{name}_max gauge")
+        lines += [f"llmfeed_{name}_max{_prom_labels(labels)} {peak:.6f}" for labels, _, _, peak in timings[name]]
+    lines.append("# TYPE llmfeed_uptime_seconds gauge")
+    lines.append(f"llmfeed_uptime_seconds {snapshot['time'] - snapshot['started']:.1f}")
+    return "\n".join(lines) + "\n"
+
+def _sum_counter(snapshot, name, **match):
+    return sum(v for n, labels, v in snapshot["counters"]
+               if n == name and all(labels.get(k) == str(m) for k, m in match.items()))
+
+def _sum_timing(snapshot, name, **match):
+    count = total = peak = 0
+    for n, labels, c, t, p in snapshot["timings"]:
+        if n == name and all(labels.get(k) == str(m) for k, m in match.items()):
+            count, total, peak = count + c, total + t, max(peak, p)
+    return count, total, peak
+
+def _label_values(snapshot, name, label):
+    return sorted({labels[label] for n, labels, *_ in snapshot["counters"] + snapshot["timings"]
+                   if n == name and label in labels})
+
+# Share of lookups answered from the cache; for the HTTP cache that includes
+# entries revalidated with a 304.
+def _hit_rate(snapshot, cache):
+    total = sum(v for n, labels, v in snapshot["counters"] if n == "cache_requests_total"
+                and labels.get("cache") == cache)
+    hits = total - _sum_counter(snapshot, "cache_requests_total", cache=cache, result="miss")
+    return f"{hits}/{total} hits ({100 * hits / total:.0f}%)" if total else "no lookups"
+
+# Human-readable dashboard text for a snapshot (GUI Metrics tab and CLI).
+def metrics_report(snapshot):
+    s = snapshot
+    uptime = s["time"] - s["started"]
+    out = [f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(s['started']))} ({uptime:.0f} s)", ""]
+    n, secs, _ = _sum_timing(s, "fetch_seconds")
+    fetched = _sum_counter(s, "fetch_bytes_total")
+    out.append(f"FETCH   {n} requests · {fetched / 1e6:.2f} MB · {secs / n if n else 0:.2f} s avg · "
+               f"HTTP cache {_hit_rate(s, 'http')}")
+    for host in _label_values(s, "fetch_seconds", "host"):
+        hn, hsecs, hmax = _sum_timing(s, "fetch_seconds", host=host)
+        statuses = ", ".join(f"{st}×{_sum_counter(s, 'fetch_requests_total', host=host, status=st)}"
+                             for st in _label_values(s, "fetch_requests_total", "status")
+                             if _sum_counter(s, "fetch_requests_total", host=host, status=st))
+        out.append(f"  {host:<32} {hn:>6} req  {hsecs / hn:6.2f} s avg  {hmax:6.2f} s max  "
+                   f"{_sum_counter(s, 'fetch_bytes_total', host=host) / 1e6:8.2f} MB  {statuses}".rstrip())
+    out.append("")
+    n, secs, _ = _sum_timing(s, "llm_seconds")
+    waits, wait_secs, wait_max = _sum_timing(s, "llm_wait_seconds")
+    prompt = _sum_counter(s, "llm_prompt_tokens_total")
+    completion = _sum_counter(s, "llm_completion_tokens_total")
+    gen_n, gen_secs, _ = _sum_timing(s, "llm_seconds", kind="complete")
+    st_n, st_secs, _ = _sum_timing(s, "llm_seconds", kind="stream")
+    gen_secs += st_secs
+    out.append(f"LLM     {n} requests · {prompt} prompt / {completion} completion tokens · "
+               f"{completion / gen_secs if gen_secs else 0:.1f} tok/s per request · "
+               f"{secs / n if n else 0:.2f} s avg · slot wait {wait_secs / waits if waits else 0:.2f} s avg "
+               f"({wait_max:.2f} s max) · response cache {_hit_rate(s, 'llm')}")
+    for kind in _label_values(s, "llm_seconds", "kind"):
+        kn, ksecs, kmax = _sum_timing(s, "llm_seconds", kind=kind)
+        out.append(f"  {kind:<32} {kn:>6} req  {ksecs / kn:6.2f} s avg  {kmax:6.2f} s max  "
+                   f"{_sum_counter(s, 'llm_completion_tokens_total', kind=kind):>8} tokens out")
+    backends = set(_label_values(s, "llm_backend_seconds", "backend"))
+    backends.update(_label_values(s, "llm_backend_errors_total", "backend"))
+    for name in sorted(backends):
+        bn, bsecs, bmax = _sum_timing(s, "llm_backend_seconds", backend=name)
+        out.append(f"  @{name:<31} {bn:>6} req  {bsecs / bn if bn else 0:6.2f} s avg  {bmax:6.2f} s max  "
+                   f"{_sum_counter(s, 'llm_backend_errors_total', backend=name)} errors  "
+                   f"{_sum_counter(s, 'llm_failovers_total', backend=name)} failovers")
+    out.append("")
+    out.append(f"INDEX   {_sum_counter(s, 'index_rows_total', index='fts')} full-text rows · "
+               f"{_sum_counter(s, 'index_rows_total', index='vectors')} vectors written")
+    out.append("")
+    out.append("STAGES")
+    for stage in _label_values(s, "stage_seconds", "stage"):
+        sn, ssecs, smax = _sum_timing(s, "stage_seconds", stage=stage)
+        items = "  ".join(f"{r} {_sum_counter(s, 'stage_items_total', stage=stage, result=r)}"
+                          for r in _label_values(s, "stage_items_total", "result")
+                          if _sum_counter(s, "stage_items_total", stage=stage, result=r))
+        out.append(f"  {stage:<32} {sn:>6} runs {ssecs:8.1f} s total {smax:8.1f} s max  {items}".rstrip())
+    errors = sorted((labels.get("stage", ""), labels.get("type", ""), v) for n, labels, v in s["counters"]
+                    if n == "errors_total")
+    out.append("")
+    out.append(f"ERRORS  {sum(v for _, _, v in errors)}")
+    out += [f"  {stage:<16} {kind:<32} {v}" for stage, kind, v in errors]
+    return "\n".join(out)
+
+def make_session(pool_size=FETCH_CONCURRENCY):
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = USER_AGENT
+    return s
+
+# Response stand-in served from the HTTP cache (fresh hit or 304). Handlers
+# see the same status_code/headers/iter_content surface as requests, plus
+# not_modified=True.
+class CachedResponse:
+    def __init__(self, url, headers, body):
+        self.url = url
+        self.status_code = 200
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.body = body
+        self.not_modified = True
+
+    def iter_content(self, chunk_size=65536):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+# On-disk conditional-GET cache: remembers ETag/Last-Modified and the body of
+# each URL, revalidates with If-None-Match/If-Modified-Since, and optionally
+# trusts entries younger than `ttl` seconds without asking the server at all.
+# Bodies beyond `max_bytes` in total are evicted least recently used first.
+class HttpCache:
+    def __init__(self, root=None, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.root = Path(root or DATA_ROOT / "http_cache")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.root / "cache.db", check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                        "headers TEXT, size INTEGER, fetched_at REAL, accessed_at REAL)")
+
+    def _body_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / key[:2] / key
+
+    def lookup(self, url):
+        with self._lock:
+            row = self.db.execute("SELECT etag, last_modified, headers, fetched_at FROM entries WHERE url = ?",
+                                  (url,)).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "headers": json.loads(row[2]), "fetched_at": row[3]}
+
+    def is_fresh(self, entry):
+        return self.ttl > 0 and time.time() - entry["fetched_at"] < self.ttl
+
+    def validators(self, entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def cacheable(self, r):
+        if "no-store" in r.headers.get("cache-control", "").lower():
+            return False
+        return bool(self.ttl > 0 or r.headers.get("etag") or r.headers.get("last-modified"))
+
+    # Returns a CachedResponse for the stored body, refreshing its timestamps
+    # (revalidated=True after a 304), or None if the body is gone.
+    def hit(self, url, entry, revalidated=False):
+        try:
+            body = self._body_path(url).read_bytes()
+        except OSError:
+            return None
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self.db.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self.db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, url))
+            self.db.commit()
+        return CachedResponse(url, entry["headers"], body)
+
+    def store(self, url, headers, body):
+        path = self._body_path(url)
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(body)
+        keep = {k: v for k, v in headers.items() if k.lower() in ("content-type", "etag", "last-modified")}
+        now = time.time()
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (url, headers.get("etag"), headers.get("last-modified"), json.dumps(keep), len(body),
+                             now, now))
+            self.db.commit()
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            total = self.db.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            victims = []
+            for url, size in self.db.execute("SELECT url, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(url)
+                total -= size
+            self.db.executemany("DELETE FROM entries WHERE url = ?", [(u,) for u in victims])
+            self.db.commit()
+        for url in victims:
+            self._body_path(url).unlink(missing_ok=True)
+        return len(victims)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+# The HTTP cache shared by every FetchEngine, so the crawler's per-batch and
+# the GUI's per-job engines don't each open a connection to it.
+def http_cache():
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+        return _http_cache
+
+# Fetches (url, handler) jobs concurrently over one pooled session. At most one
+# request per host is in flight and requests to the same host are spaced by
+# host_delay; different hosts run in parallel up to the concurrency limit.
+# handler(url, response) does the saving and returns a progress message;
+# response.not_modified is True when it was served from the HTTP cache.
+class FetchEngine:
+    def __init__(self, concurrency=FETCH_CONCURRENCY, host_delay=HOST_DELAY, timeout=10, session=None, cache=None,
+                 per_host=HOST_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.host_delay = host_delay
+        self.per_host = max(1, per_host)
+        # host -> robots.txt Crawl-delay; such hosts get one request at a time.
+        self.host_delays = {}
+        # host -> when its last request started, so the delay also holds
+        # across run() calls (robots.txt, sitemaps, then page batches).
+        self._last_start = {}
+        self.timeout = timeout
+        self.session = session or make_session(self.concurrency)
+        self.cache = cache if cache is not None else (http_cache() if HTTP_CACHE else False)
+
+    def _fetch_one(self, url, handler):
+        host = urlsplit(url).netloc.lower()
+        stats = {"status": "error", "bytes": 0}
+        start = time.monotonic()
         try:
-            self.fetch_func()
-            self.done.emit("[✓] Done")
+            entry = self.cache.lookup(url) if self.cache else None
+            if entry and self.cache.is_fresh(entry):
+                cached = self.cache.hit(url, entry)
+                if cached:
+                    stats["status"] = "cached"
+                    return handler(url, cached)
+            headers = self.cache.validators(entry) if self.cache else {}
+            with self.session.get(url, timeout=self.timeout, stream=True, headers=headers) as r:
+                stats["status"] = r.status_code
+                if r.status_code == 304 and entry:
+                    cached = self.cache.hit(url, entry, revalidated=True)
+                    if cached:
+                        return handler(url, cached)
+                    # Cached body vanished; fetch unconditionally.
+                    return self._fetch_uncached(url, handler, stats)
+                return self._handle_live(url, r, handler, stats)
         except Exception as e:
-            self.done.emit(f"[✗] Failed: {str(e)}")
-    def stop(self):
-        self._running = False
-
-def fetch_gutenberg():
-    r = requests.get("https://www.gutenberg.org/files/1342/1342-0.txt", timeout=10)
-    if r.status_code == 200:
-        (DATA_ROOT / "gutenberg_pride_prejudice.txt").write_text(r.text, encoding="utf-8")
-
-def fetch_rfcs():
-    for i in [1, 10, 100, 1000]:
-        r = requests.get(f"https://www.rfc-editor.org/rfc/rfc{i}.txt", timeout=8)
-        if r.status_code == 200:
-            (DATA_ROOT / f"rfc{i}.txt").write_text(r.text, encoding="utf-8")
-
-def fetch_manpages():
+            metrics.error("fetch", e)
+            return f"[✗] Error: {url}: {str(e)}"
+        finally:
+            elapsed = time.monotonic() - start
+            metrics.inc("fetch_requests_total", host=host, status=stats["status"])
+            metrics.inc("fetch_bytes_total", stats["bytes"], host=host)
+            metrics.observe("fetch_seconds", elapsed, host=host)
+            if self.cache:
+                result = {"cached": "hit", 304: "revalidated"}.get(stats["status"], "miss")
+                metrics.inc("cache_requests_total", cache="http", result=result)
+            metrics.event("fetch", url=url, host=host, status=stats["status"], bytes=stats["bytes"],
+                          seconds=round(elapsed, 4))
+
+    def _fetch_uncached(self, url, handler, stats):
+        with self.session.get(url, timeout=self.timeout, stream=True) as r:
+            stats["status"] = r.status_code
+            return self._handle_live(url, r, handler, stats)
+
+    # Hands a live response to the handler, counting the body bytes into
+    # stats and copying the body into the cache as the handler streams it
+    # (complete bodies only).
+    def _handle_live(self, url, r, handler, stats):
+        r.not_modified = False
+        store = bool(self.cache and r.status_code == 200 and self.cache.cacheable(r))
+        chunks = []
+        stream = r.iter_content
+        def tee(chunk_size=1, decode_unicode=False):
+            for chunk in stream(chunk_size):
+                stats["bytes"] += len(chunk)
+                if store:
+                    chunks.append(chunk)
+                yield chunk
+        r.iter_content = tee
+        msg = handler(url, r)
+        if store and getattr(r, "truncated", True) is False:
+            self.cache.store(url, r.headers, b"".join(chunks))
+        return msg
+
+    def _delay(self, host):
+        return max(self.host_delay, self.host_delays.get(host, 0.0))
+
+    def _slots(self, host):
+        return 1 if host in self.host_delays else self.per_host
+
+    # Requests to one host start at least _delay(host) apart, also across
+    # calls, with up to _slots(host) of them in flight. done(url), if given,
+    # is called as each fetch finishes (for checkpoints).
+    def run(self, jobs, progress=None, running=None, done=None):
+        progress = progress or _noop
+        running = running or _always
+        done = done or _noop
+        queues = {}
+        for url, handler in jobs:
+            queues.setdefault(urlsplit(url).netloc.lower(), deque()).append((url, handler))
+        ready = [(self._last_start.get(host, float("-inf")) + self._delay(host), host) for host in queues]
+        heapq.heapify(ready)
+        scheduled = set(queues)
+        inflight = Counter()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while ready or pending:
+                if not running():
+                    break
+                now = time.monotonic()
+                while ready and ready[0][0] <= now and len(pending) < self.concurrency:
+                    _, host = heapq.heappop(ready)
+                    url, handler = queues[host].popleft()
+                    progress(f"[→] Fetching {url}")
+                    pending[pool.submit(self._fetch_one, url, handler)] = (host, url)
+                    inflight[host] += 1
+                    self._last_start[host] = now
+                    if queues[host] and inflight[host] < self._slots(host):
+                        heapq.heappush(ready, (now + self._delay(host), host))
+                    else:
+                        scheduled.discard(host)
+                # Wake up for whichever comes first: a finished fetch, a host
+                # becoming eligible again, or a periodic stop() check.
+                timeout = 0.5
+                if ready and len(pending) < self.concurrency:
+                    timeout = min(timeout, max(0.0, ready[0][0] - now))
+                if not pending:
+                    time.sleep(timeout)
+                    continue
+                finished, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    host, url = pending.pop(fut)
+                    inflight[host] -= 1
+                    progress(fut.result())
+                    done(url)
+                    if queues[host] and host not in scheduled:
+                        scheduled.add(host)
+                        heapq.heappush(ready, (time.monotonic() + self._delay(host), host))
+            # Let in-flight requests finish so handlers never write half a batch.
+            for fut, (_, url) in list(pending.items()):
+                progress(fut.result())
+                done(url)
+
+PRIORITY_BULK, PRIORITY_NORMAL, PRIORITY_INTERACTIVE = 0, 5, 10
+
+# One llama.cpp (or compatible) server. url may be the server root or its
+# /completion endpoint. tasks lists the tasks this server is reserved for
+# (e.g. ["classify"] for a small fast model); without it the server takes
+# any task. up is cleared when a request to it fails and set again by a
+# successful request or health check.
+class LLMBackend:
+    def __init__(self, url, parallel=LLM_PARALLEL, tasks=(), model="", embed_url=None):
+        parts = urlsplit(url)
+        path = parts.path.rstrip("/")
+        for suffix in ("/completion", "/v1/embeddings", "/embedding"):
+            if path.endswith(suffix):
+                path = path[:-len(suffix)]
+        self.base = urlunsplit((parts.scheme, parts.netloc, path, "", ""))
+        self.name = parts.netloc + path
+        self.url = self.base + "/completion"
+        self.embed_url = embed_url or self.base + "/v1/embeddings"
+        self.parallel = max(1, int(parallel))
+        self.tasks = (tasks,) if isinstance(tasks, str) else tuple(tasks or ())
+        self._model = model
+        self.inflight = 0
+        self.up = True
+
+    # Model identity for cache keys: the configured name, else the model the
+    # server reports on /props (llama.cpp), else the endpoint URL.
+    def model(self, session):
+        if not self._model:
+            try:
+                props = session.get(f"{self.base}/props", timeout=5).json()
+                self._model = props.get("model_path") or props.get("default_generation_settings", {}).get("model")
+            except (requests.RequestException, ValueError, AttributeError):
+                pass
+            self._model = self._model or self.url
+        return self._model
+
+    # llama.cpp answers /health with 200 once the model is loaded (503
+    # while loading); servers without the endpoint count as up if they answer.
+    def check(self, session):
+        try:
+            r = session.get(f"{self.base}/health", timeout=5)
+            r.close()
+            return r.status_code in (200, 404)
+        except requests.RequestException:
+            return False
+
+# Backends from LLMFEED_LLM_BACKENDS (comma-separated server URLs), else
+# backends.json in the data directory, e.g.
+#   [{"url": "http://10.0.0.2:8080", "parallel": 4, "tasks": ["classify"], "model": "qwen-1.5b"},
+#    {"url": "http://10.0.0.3:8080", "parallel": 2}]
+# else the single server at LLM_URL. LLMFEED_EMBED_URL adds a server used for
+# embeddings only.
+def load_backends(path=None, parallel=LLM_PARALLEL, model=LLM_MODEL):
+    path = Path(path or DATA_ROOT / "backends.json")
+    if LLM_BACKENDS:
+        entries = [{"url": url.strip()} for url in LLM_BACKENDS.split(",") if url.strip()]
+    else:
+        try:
+            entries = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            entries = [{"url": LLM_URL}]
+        if not isinstance(entries, list) or not all(isinstance(e, dict) and e.get("url") for e in entries):
+            raise ValueError(f"{path}: expected a list of objects with a \"url\"")
+    backends = [LLMBackend(e["url"], e.get("parallel", parallel), e.get("tasks", ()), e.get("model") or model)
+                for e in entries]
+    if EMBED_URL:
+        backends.append(LLMBackend(EMBED_URL, parallel, ("embed",), model, embed_url=EMBED_URL))
+    return backends
+
+# Hands out request slots across backends. A task goes to the backends
+# reserved for it, else to the general ones; when all of those are down it
+# fails over to the general ones, and when nothing is up it keeps trying its
+# own. Free slots go to waiters in priority order (FIFO among equals), each
+# taking the candidate with the fewest outstanding requests per slot, so an
+# interactive request waits for at most one in-flight completion instead of
+# a whole bulk backlog. Down backends are probed every health_interval
+# seconds until they answer again.
+class BackendPool:
+    def __init__(self, backends, session, health_interval=LLM_HEALTH_INTERVAL):
+        if not backends:
+            raise ValueError("no LLM backends configured")
+        self.backends = list(backends)
+        self.capacity = sum(b.parallel for b in self.backends)
+        self.session = session
+        self.health_interval = health_interval
+        self._waiting = []
+        self._granted = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._checker = None
+
+    def route(self, task):
+        reserved = [b for b in self.backends if task in b.tasks]
+        general = [b for b in self.backends if not b.tasks]
+        if reserved:
+            return reserved, general
+        return general or self.backends, []
+
+    def _candidates(self, task):
+        primary, fallback = self.route(task)
+        for tier in (primary, fallback):
+            up = [b for b in tier if b.up]
+            if up:
+                return up
+        return primary + fallback
+
+    def _grant(self):
+        granted = False
+        for ticket in sorted(self._waiting):
+            free = [b for b in self._candidates(ticket[2]) if b.inflight < b.parallel]
+            if len(free) > 1 and ticket[3] in free:
+                free.remove(ticket[3])
+            if free:
+                backend = min(free, key=lambda b: (b.inflight / b.parallel, b.inflight))
+                backend.inflight += 1
+                self._waiting.remove(ticket)
+                self._granted[ticket] = backend
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    # avoid names a backend to skip if any other candidate is free.
+    def acquire(self, task=None, priority=PRIORITY_BULK, avoid=None):
+        with self._cond:
+            self._seq += 1
+            ticket = (-priority, self._seq, task, avoid)
+            self._waiting.append(ticket)
+            self._grant()
+            while ticket not in self._granted:
+                self._cond.wait()
+            return self._granted.pop(ticket)
+
+    def release(self, backend):
+        with self._cond:
+            backend.inflight -= 1
+            self._grant()
+
+    @contextmanager
+    def __call__(self, task=None, priority=PRIORITY_BULK, avoid=None):
+        backend = self.acquire(task, priority, avoid)
+        try:
+            yield backend
+        finally:
+            self.release(backend)
+
+    # Whether a backend for `task` other than `backend` has a free slot now.
+    def free_elsewhere(self, backend, task=None):
+        with self._cond:
+            return any(b is not backend and b.inflight < b.parallel for b in self._candidates(task))
+
+    # Takes a failed backend out of rotation; returns whether the task has
+    # another backend that is up to fail over to.
+    def mark_down(self, backend, task=None):
+        with self._cond:
+            if backend.up:
+                backend.up = False
+                metrics.inc("llm_backend_down_total", backend=backend.name)
+                if self._checker is None:
+                    self._checker = threading.Thread(target=self._watch, name="llm-health", daemon=True)
+                    self._checker.start()
+                self._grant()
+            primary, fallback = self.route(task)
+            return any(b.up for b in primary + fallback)
+
+    def mark_up(self, backend):
+        with self._cond:
+            if not backend.up:
+                backend.up = True
+                self._grant()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.health_interval)
+            with self._cond:
+                down = [b for b in self.backends if not b.up]
+                if not down:
+                    self._checker = None
+                    return
+            for backend in down:
+                if backend.check(self.session):
+                    self.mark_up(backend)
+
+    # Probes every backend now; returns one status dict per backend.
+    def check(self):
+        for backend in self.backends:
+            if backend.check(self.session):
+                self.mark_up(backend)
+            else:
+                self.mark_down(backend)
+        return [{"name": b.name, "url": b.base, "tasks": list(b.tasks), "parallel": b.parallel,
+                 "inflight": b.inflight, "up": b.up, "model": b.model(self.session) if b.up else ""}
+                for b in self.backends]
+
+class LLMError(Exception):
+    def __init__(self, message, status=None, retryable=False, attempts=1):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.attempts = attempts
+
+    def __str__(self):
+        msg = super().__str__()
+        return f"{msg} (after {self.attempts} attempts)" if self.attempts > 1 else msg
+
+# Persistent completion cache keyed by sha256 of (model, request payload), so
+# the prompt and every sampling parameter are part of the key. Entries older
+# than max_days are dropped and, past max_bytes, the least recently used go
+# first. hits/misses count lookups made by this process.
+class ResponseCache:
+    def __init__(self, path=None, max_bytes=LLM_CACHE_MAX_BYTES, max_days=LLM_CACHE_DAYS):
+        DATA_ROOT.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_days * 86400
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.db = sqlite3.connect(path or DATA_ROOT / "llm_cache.db", check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, content TEXT, "
+                        "size INTEGER, created_at REAL, used_at REAL, hits INTEGER DEFAULT 0)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used_at)")
+
+    @staticmethod
+    def key(model, payload):
+        body = json.dumps({"model": model, **{k: v for k, v in payload.items() if k != "stream"}}, sort_keys=True)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self.db.execute("SELECT content FROM responses WHERE key = ? AND created_at >= ?",
+                                  (key, now - self.max_age)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute("UPDATE responses SET used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.db.commit()
+            return row[0]
+
+    def put(self, key, model, content):
+        now = time.time()
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, 0)",
+                            (key, model, content, len(content.encode("utf-8")), now, now))
+            self._puts += 1
+            if self._puts % 100 == 1:
+                self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now):
+        self.db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        total = self.db.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            victims = []
+            for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                if total <= self.max_bytes * 0.9:
+                    break
+                victims.append((key,))
+                total -= size
+            self.db.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self):
+        with self._lock:
+            entries, size, hits = self.db.execute(
+                "SELECT count(*), coalesce(sum(size), 0), coalesce(sum(hits), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "stored_hits": hits, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+            self._puts = 0
+
+    def close(self):
+        with self._lock:
+            self._evict(time.time())
+            self.db.commit()
+            self.db.close()
+
+# Shared completion client: one pooled session over a BackendPool, at most
+# `parallel` requests in flight per backend across all workers. A backend
+# that is unreachable (or behind a failing proxy: 502/504) is taken out of
+# rotation and the request moves to another one at once; overloaded servers
+# (429/503), or all backends down, are retried with exponential backoff.
+# Completions are answered from the ResponseCache when the same request was
+# made before (cache=False or LLMFEED_LLM_CACHE=0 bypasses it).
+#
+# task ("summarize", "classify", "cheatsheet", "ask", "embed") picks the
+# backends, see load_backends(). url/embed_url/model configure a single
+# server instead, as before.
+class LLMClient:
+    RETRY_STATUS = (429, 502, 503, 504)
+    FAILOVER_STATUS = (502, 504)
+
+    def __init__(self, url=None, parallel=LLM_PARALLEL, timeout=LLM_TIMEOUT, retries=LLM_RETRIES,
+                 embed_url=None, model=LLM_MODEL, cache=None, backends=None):
+        if backends is None:
+            backends = [LLMBackend(url, parallel, (), model, embed_url)] if url else load_backends(
+                parallel=parallel, model=model)
+        self.cache = cache if cache is not None else (ResponseCache() if LLM_CACHE else False)
+        self.timeout = timeout
+        self.retries = retries
+        capacity = sum(b.parallel for b in backends)
+        self.session = make_session(capacity)
+        self.pool = BackendPool(backends, self.session)
+        self.parallel = self.pool.capacity
+
+    # Sends payload to a backend for `task` and yields (backend, response,
+    # start) while holding its slot; start is when the slot was granted. The
+    # slot is leased per attempt, so it is given back on any exception and
+    # before every backoff sleep. Only transport failures (and 502/504) take
+    # the backend out of rotation; a busy backend (429/503) is retried on
+    # another one with a free slot at once, else after the backoff.
+    @contextmanager
+    def _request(self, payload, task=None, priority=PRIORITY_BULK, stream=False, embed=False):
+        delay = 1.0
+        attempt = 1
+        failovers = 0
+        busy = None
+        while True:
+            with self.pool(task, priority, busy) as backend:
+                start = time.monotonic()
+                url = backend.embed_url if embed else backend.url
+                try:
+                    r = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    err = LLMError(f"{type(e).__name__} talking to {url}", retryable=True, attempts=attempt)
+                    kind = type(e).__name__
+                    failover = True
+                else:
+                    if r.status_code == 200:
+                        self.pool.mark_up(backend)
+                        yield backend, r, start
+                        return
+                    r.close()
+                    err = LLMError(f"HTTP {r.status_code} from {url}", status=r.status_code,
+                                   retryable=r.status_code in self.RETRY_STATUS, attempts=attempt)
+                    kind = f"HTTP {r.status_code}"
+                    failover = r.status_code in self.FAILOVER_STATUS
+                    retry_after = r.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+            metrics.inc("llm_backend_errors_total", backend=backend.name, reason=kind)
+            if failover and self.pool.mark_down(backend, task) and failovers < len(self.pool.backends):
+                failovers += 1
+                metrics.inc("llm_failovers_total", backend=backend.name)
+                continue
+            if not err.retryable or attempt > self.retries:
+                metrics.error("llm", kind)
+                raise err
+            metrics.inc("llm_retries_total", reason=kind)
+            busy = None if failover else backend
+            if failover or not self.pool.free_elsewhere(backend, task):
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            attempt += 1
+
+    # Model identity of the backends `task` normally goes to, for cache keys.
+    def model(self, task=None):
+        return self.pool.route(task)[0][0].model(self.session)
+
+    # Records one finished request: time waiting for a slot, time on the
+    # server and token counts (as reported by llama.cpp, else estimated).
+    @staticmethod
+    def _record(kind, backend, queued, start, prompt_tokens, completion_tokens):
+        elapsed = time.monotonic() - start
+        metrics.observe("llm_wait_seconds", start - queued, kind=kind)
+        metrics.observe("llm_seconds", elapsed, kind=kind)
+        metrics.observe("llm_backend_seconds", elapsed, backend=backend.name)
+        metrics.inc("llm_prompt_tokens_total", prompt_tokens, kind=kind)
+        metrics.inc("llm_completion_tokens_total", completion_tokens, kind=kind)
+        metrics.event("llm", kind=kind, backend=backend.name, wait=round(start - queued, 4),
+                      seconds=round(elapsed, 4), prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                      tokens_per_second=round(completion_tokens / elapsed, 2) if elapsed else None)
+
+    # Stores an answer under the model that produced it, which differs from
+    # the lookup key's model only after failing over to another model.
+    def _cache_put(self, key, model, payload, backend, content):
+        served_by = backend.model(self.session)
+        if served_by != model:
+            key = ResponseCache.key(served_by, payload)
+        self.cache.put(key, served_by, content)
+
+    # priority orders requests waiting for a slot (PRIORITY_INTERACTIVE for
+    # Ask, PRIORITY_BULK for pipeline stages).
+    def complete(self, prompt, n_predict=200, cache=True, priority=PRIORITY_BULK, task=None, **params):
+        return self.complete_cached(prompt, n_predict, cache, priority, task, **params)[0]
+
+    # Like complete(), but returns (content, True if served from the cache).
+    def complete_cached(self, prompt, n_predict=200, cache=True, priority=PRIORITY_BULK, task=None, **params):
+        payload = {"prompt": prompt, "n_predict": n_predict, **params}
+        key = None
+        if cache and self.cache:
+            model = self.model(task)
+            key = ResponseCache.key(model, payload)
+            content = self.cache.get(key)
+            metrics.inc("cache_requests_total", cache="llm", result="miss" if content is None else "hit")
+            if content is not None:
+                return content.strip(), True
+        queued = time.monotonic()
+        with self._request(payload, task, priority) as (backend, r, start):
+            try:
+                data = r.json()
+                content = data.get("content", "")
+            except ValueError:
+                raise LLMError(f"Invalid JSON from {backend.url}")
+            self._record("complete", backend, queued, start, data.get("tokens_evaluated") or approx_tokens(prompt),
+                         data.get("tokens_predicted") or approx_tokens(content))
+        if key:
+            self._cache_put(key, model, payload, backend, content)
+        return content.strip(), False
+
+    # One embedding per text from the server's OpenAI-style /v1/embeddings
+    # endpoint (llama.cpp: start it with --embeddings); the older /embedding
+    # list reply is accepted too.
+    def embed(self, texts, priority=PRIORITY_BULK, task="embed"):
+        queued = time.monotonic()
+        with self._request({"input": list(texts)}, task, priority, embed=True) as (backend, r, start):
+            try:
+                data = r.json()
+            except ValueError:
+                raise LLMError(f"Invalid JSON from {backend.embed_url}")
+            usage = data.get("usage") if isinstance(data, dict) else None
+            self._record("embed", backend, queued, start, (usage or {}).get("prompt_tokens")
+                         or sum(approx_tokens(t) for t in texts), 0)
+        if isinstance(data, dict) and "data" in data:
+            items = sorted(data["data"], key=lambda d: d.get("index", 0))
+        else:
+            items = data if isinstance(data, list) else [data]
+        vectors = [item.get("embedding") for item in items if isinstance(item, dict)]
+        if len(vectors) != len(texts) or not all(vectors):
+            raise LLMError(f"Expected {len(texts)} embeddings from {backend.embed_url}, got {len(vectors)}")
+        return vectors
+
+    # Yields completion text pieces as the server produces them, using the
+    # endpoint's server-sent events (stream: true). Retries and failover only
+    # happen before the first piece, so a partial answer is never repeated. A
+    # cached answer is yielded as one piece; only answers streamed to the end
+    # are cached.
+    def stream(self, prompt, n_predict=200, cache=True, priority=PRIORITY_BULK, task=None, **params):
+        payload = {"prompt": prompt, "n_predict": n_predict, **params, "stream": True}
+        key = None
+        if cache and self.cache:
+            model = self.model(task)
+            key = ResponseCache.key(model, payload)
+            content = self.cache.get(key)
+            metrics.inc("cache_requests_total", cache="llm", result="miss" if content is None else "hit")
+            if content is not None:
+                yield content
+                return
+        pieces = []
+        queued = time.monotonic()
+        with self._request(payload, task, priority, stream=True) as (backend, r, start):
+            chunk = {}
+            try:
+                with r:
+                    # llama.cpp sends text/event-stream without a charset,
+                    # for which requests would guess ISO-8859-1.
+                    for raw in r.iter_lines(chunk_size=None):
+                        line = raw.decode("utf-8", errors="replace")
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError:
+                            raise LLMError(f"Invalid stream event from {backend.url}")
+                        if chunk.get("content"):
+                            pieces.append(chunk["content"])
+                            yield chunk["content"]
+                        if chunk.get("stop"):
+                            break
+            finally:
+                # The final event carries llama.cpp's counts; each event is
+                # about one token otherwise.
+                self._record("stream", backend, queued, start, chunk.get("tokens_evaluated") or approx_tokens(prompt),
+                             chunk.get("tokens_predicted") or len(pieces))
+        if key:
+            self._cache_put(key, model, payload, backend, "".join(pieces))
+
+    # Runs fn(item) for every item with up to `parallel` calls in flight and
+    # yields (item, result, error) as each finishes. Items not yet started are
+    # cancelled once running() turns false.
+    def map(self, fn, items, running=None):
+        running = running or _always
+        with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+            futures = {pool.submit(fn, item): item for item in items}
+            try:
+                for fut in as_completed(futures):
+                    try:
+                        yield futures[fut], fut.result(), None
+                    except Exception as e:
+                        yield futures[fut], None, e
+                    if not running():
+                        break
+            finally:
+                for fut in futures:
+                    fut.cancel()
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def llm_client():
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient()
+        return _llm_client
+
+NOISE_TAGS = {"script", "style", "noscript", "template", "nav", "header", "footer", "aside", "form",
+              "svg", "iframe", "button", "select"}
+PARA_TAGS = {"p", "div", "section", "article", "main", "h1", "h2", "h3", "h4", "h5", "h6", "pre",
+             "blockquote", "table", "ul", "ol", "dl", "figure", "hr"}
+LINE_TAGS = {"br", "li", "tr", "dt", "dd", "td", "th", "caption"}
+
+def response_charset(r):
+    m = re.search(r"charset=([\w.:-]+)", r.headers.get("content-type", ""), re.I)
+    return m.group(1) if m else "utf-8"
+
+# Decodes a streamed response body piece by piece and stops after `limit`
+# bytes, setting r.truncated so callers can say so.
+def iter_body(r, limit=MAX_PAGE_BYTES):
+    try:
+        decoder = codecs.getincrementaldecoder(response_charset(r))(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    r.truncated = False
+    read = 0
+    for chunk in r.iter_content(64 * 1024):
+        chunk = chunk[:limit - read]
+        read += len(chunk)
+        yield decoder.decode(chunk)
+        if read >= limit:
+            r.truncated = True
+            break
+    yield decoder.decode(b"", final=True)
+
+def read_body_text(r, limit=MAX_PAGE_BYTES):
+    return "".join(iter_body(r, limit))
+
+# Incremental fallback when lxml is not installed: drops NOISE_TAGS content,
+# turns block elements into line breaks, and with `only` keeps just the text
+# of the first such element (whitespace preserved, e.g. a man page <pre>).
+class TextExtractor(HTMLParser):
+    def __init__(self, only=None):
+        super().__init__(convert_charrefs=True)
+        self.only = only
+        self.skip = 0
+        self.capture = 0 if only else 1
+        self.found = False
+        self.out = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.only:
+            if tag == self.only and not self.found:
+                self.capture += 1
+        elif tag in NOISE_TAGS:
+            self.skip += 1
+        elif tag in PARA_TAGS:
+            self.out.append("\n\n")
+        elif tag in LINE_TAGS:
+            self.out.append("\n")
+
+    def handle_endtag(self, tag):
+        if self.only:
+            if tag == self.only and self.capture:
+                self.capture -= 1
+                self.found = not self.capture
+        elif tag in NOISE_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in PARA_TAGS:
+            self.out.append("\n\n")
+
+    def handle_data(self, data):
+        if self.capture and not self.skip:
+            self.out.append(data)
+
+def _lxml_text(pieces, only):
+    parser = lxml_etree.HTMLParser(remove_comments=True, remove_pis=True)
+    for piece in pieces:
+        if piece:
+            parser.feed(piece)
+    try:
+        root = parser.close()
+    except lxml_etree.XMLSyntaxError:  # nothing was fed: an empty body
+        root = None
+    if root is None:
+        return None if only else ""
+    if only:
+        el = root.find(f".//{only}")
+        return None if el is None else "".join(el.itertext())
+    lxml_etree.strip_elements(root, *NOISE_TAGS, with_tail=False)
+    for el in root.iter(*PARA_TAGS):
+        el.tail = "\n\n" + (el.tail or "")
+        el.text = "\n\n" + (el.text or "")
+    for el in root.iter(*LINE_TAGS):
+        el.tail = "\n" + (el.tail or "")
+    return "".join(root.itertext())
+
+def normalize_text(text):
+    lines = (re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in text.split("\n"))
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+# Turns decoded HTML pieces into clean text: lxml when available, otherwise
+# the stdlib streaming parser. With `only`, returns the raw text of the first
+# matching element, or None when there is none.
+def html_to_text(pieces, only=None):
+    if lxml_etree is not None:
+        text = _lxml_text(pieces, only)
+    else:
+        extractor = TextExtractor(only)
+        for piece in pieces:
+            extractor.feed(piece)
+        extractor.close()
+        text = "".join(extractor.out) if (extractor.found or extractor.capture or not only) else None
+    if only or text is None:
+        return text
+    return normalize_text(text) if text.strip() else ""
+
+NEAR_DUP_BITS = int(os.environ.get("LLMFEED_NEAR_DUP_BITS", "6"))
+SIMHASH_BANDS = 8
+SIMHASH_MIN_SHINGLES = 20
+# Store new documents in the packed corpus instead of loose .txt files.
+PACK_CORPUS = os.environ.get("LLMFEED_PACK", "0") != "0"
+PACK_SEGMENT_BYTES = int(os.environ.get("LLMFEED_PACK_SEGMENT_MB", "64")) << 20
+PACK_ZSTD_LEVEL = 3
+# translate() tables mapping a byte to its bit b, so set bits are counted
+# column by column at C speed instead of shingle by shingle.
+_BIT_TABLES = [bytes(v >> b & 1 for v in range(256)) for b in range(8)]
+
+# 64-bit SimHash over word 3-shingles; None for texts too short to compare.
+def simhash(text):
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+    if len(shingles) < SIMHASH_MIN_SHINGLES:
+        return None
+    data = b"".join(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest() for sh in shingles)
+    counts = [data[k::8].translate(_BIT_TABLES[b]).count(1) for k in range(8) for b in range(8)]
+    half = len(shingles) / 2
+    return sum(1 << i for i, n in enumerate(counts) if n > half)
+
+# Append-only packed corpus (corpus/ in the data dir). Each document is
+# compressed on its own (zstd, or zlib without the zstandard module) and
+# appended to the current segment file; corpus.db maps its hash to the
+# segment and offset. Segments are read through read-only memory maps, so a
+# lookup touches only its own record and a scan in segment order streams the
+# files front to back. Deleted or replaced documents leave dead records
+# until compact() copies the live ones out of mostly-dead segments. Every
+# record carries a header (magic, codec, lengths, hash) and is checked on read.
+class CorpusPack:
+    MAGIC = b"LFP1"
+    HEADER = struct.Struct("<4sB3xII32s")
+    ZLIB, ZSTD = 1, 2
+    DECOMPRESS_ERRORS = (zlib.error, *((zstandard.ZstdError,) if zstandard is not None else ()))
+
+    def __init__(self, root=None, segment_bytes=PACK_SEGMENT_BYTES):
+        self.root = Path(root or DATA_ROOT / "corpus")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._maps = {}
+        self.db = sqlite3.connect(self.root / "corpus.db", check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS records (hash TEXT PRIMARY KEY, segment INTEGER, "
+                        "offset INTEGER, length INTEGER, size INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS records_segment ON records (segment, offset)")
+        self.db.commit()
+        segments = self._segments()
+        self.active = segments[-1] if segments else 1
+
+    def _segments(self):
+        return sorted(int(p.stem.split("-")[1]) for p in self.root.glob("seg-*.pack"))
+
+    def _segment_path(self, segment):
+        return self.root / f"seg-{segment:06d}.pack"
+
+    def _compress(self, data):
+        if zstandard is None:
+            return self.ZLIB, zlib.compress(data, 6)
+        if not hasattr(self._local, "zc"):
+            self._local.zc = zstandard.ZstdCompressor(level=PACK_ZSTD_LEVEL)
+        return self.ZSTD, self._local.zc.compress(data)
+
+    def _decompress(self, codec, payload):
+        if codec == self.ZLIB:
+            return zlib.decompress(payload)
+        if codec == self.ZSTD and zstandard is not None:
+            if not hasattr(self._local, "zd"):
+                self._local.zd = zstandard.ZstdDecompressor()
+            return self._local.zd.decompress(payload)
+        raise ValueError("zstd-compressed record; install python3-zstandard to read it")
+
+    def _map(self, segment):
+        mm = self._maps.get(segment)
+        if mm is None:
+            with open(self._segment_path(segment), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mm
+        return mm
+
+    def _drop_map(self, segment):
+        mm = self._maps.pop(segment, None)
+        if mm is not None:
+            mm.close()
+
+    # Appends ready-made records [(hash, header + payload, size)] to the
+    # active segment, rolling over to a new one once it is full.
+    def _append(self, records):
+        path = self._segment_path(self.active)
+        end = path.stat().st_size if path.exists() else 0
+        if end and end + sum(len(r[1]) for r in records) > self.segment_bytes:
+            self.active += 1
+            path, end = self._segment_path(self.active), 0
+        rows = []
+        with open(path, "ab") as f:
+            for digest, record, size in records:
+                f.write(record)
+                rows.append((digest, self.active, end, len(record) - self.HEADER.size, size))
+                end += len(record)
+        self._drop_map(self.active)
+        self.db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+
+    def put(self, digest, data):
+        codec, payload = self._compress(data)
+        record = self.HEADER.pack(self.MAGIC, codec, len(payload), len(data), bytes.fromhex(digest)) + payload
+        with self._lock:
+            if not self.db.execute("SELECT 1 FROM records WHERE hash = ?", (digest,)).fetchone():
+                self._append([(digest, record, len(data))])
+
+    def has(self, digest):
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM records WHERE hash = ?", (digest,)).fetchone() is not None
+
+    def _read(self, digest, segment, offset, length):
+        with self._lock:
+            raw = self._map(segment)[offset:offset + self.HEADER.size + length]
+        magic, codec, stored, size, digest_bytes = self.HEADER.unpack_from(raw)
+        if magic != self.MAGIC or stored != length or digest_bytes.hex() != digest:
+            raise ValueError(f"corrupt record for {digest[:12]} in {self._segment_path(segment).name}")
+        try:
+            data = self._decompress(codec, raw[self.HEADER.size:])
+        except self.DECOMPRESS_ERRORS:
+            data = None
+        if data is None or len(data) != size:
+            raise ValueError(f"corrupt record for {digest[:12]} in {self._segment_path(segment).name}")
+        return data
+
+    def get(self, digest):
+        with self._lock:
+            row = self.db.execute("SELECT segment, offset, length FROM records WHERE hash = ?", (digest,)).fetchone()
+        if not row:
+            raise FileNotFoundError(f"{digest[:12]} is not in the packed corpus")
+        return self._read(digest, *row)
+
+    # Yields (hash, bytes) for the given hashes (default: all) in segment
+    # order, so a full scan reads each segment sequentially.
+    def scan(self, digests=None):
+        with self._lock:
+            if digests is None:
+                rows = self.db.execute("SELECT hash, segment, offset, length FROM records "
+                                       "ORDER BY segment, offset").fetchall()
+            else:
+                rows = []
+                digests = list(digests)
+                for i in range(0, len(digests), 500):
+                    part = digests[i:i + 500]
+                    rows += self.db.execute(f"SELECT hash, segment, offset, length FROM records WHERE hash IN "
+                                            f"({','.join('?' * len(part))})", part).fetchall()
+                rows.sort(key=lambda r: (r[1], r[2]))
+        for digest, segment, offset, length in rows:
+            try:
+                yield digest, self._read(digest, segment, offset, length)
+            except (OSError, ValueError):
+                continue
+
+    def delete(self, digest):
+        with self._lock:
+            self.db.execute("DELETE FROM records WHERE hash = ?", (digest,))
+            self.db.commit()
+
+    def stats(self):
+        with self._lock:
+            records, stored, raw = self.db.execute(
+                "SELECT count(*), coalesce(sum(length), 0), coalesce(sum(size), 0) FROM records").fetchone()
+        disk = sum(self._segment_path(s).stat().st_size for s in self._segments())
+        return {"records": records, "raw_bytes": raw, "live_bytes": stored + records * self.HEADER.size,
+                "disk_bytes": disk, "segments": len(self._segments()),
+                "codec": "zstd" if zstandard is not None else "zlib"}
+
+    # Rewrites segments whose dead space is at least min_dead of their size:
+    # live records are copied (still compressed) into a fresh segment, then
+    # the old file is removed. Returns (segments compacted, bytes freed).
+    def compact(self, min_dead=0.3, running=_always):
+        with self._lock:
+            live = dict(self.db.execute("SELECT segment, sum(length) + count(*) * ? FROM records GROUP BY segment",
+                                        (self.HEADER.size,)).fetchall())
+            segments = self._segments()
+            victims = []
+            for segment in segments:
+                size = self._segment_path(segment).stat().st_size
+                if size and 1 - live.get(segment, 0) / size >= min_dead:
+                    victims.append((segment, size))
+            if not victims:
+                return 0, 0
+            self.active = segments[-1] + 1
+            done = freed = 0
+            for segment, size in victims:
+                if not running():
+                    break
+                rows = self.db.execute("SELECT hash, offset, length, size FROM records WHERE segment = ? "
+                                       "ORDER BY offset", (segment,)).fetchall()
+                mm = self._map(segment)
+                batch = []
+                for digest, offset, length, raw_size in rows:
+                    batch.append((digest, mm[offset:offset + self.HEADER.size + length], raw_size))
+                    if len(batch) >= 256:
+                        self._append(batch)
+                        batch = []
+                if batch:
+                    self._append(batch)
+                self._drop_map(segment)
+                self._segment_path(segment).unlink()
+                freed += size - live.get(segment, 0)
+                done += 1
+            return done, freed
+
+    def close(self):
+        with self._lock:
+            for segment in list(self._maps):
+                self._drop_map(segment)
+            self.db.close()
+
+# Content-addressed view of the saved documents. Every source (a URL or
+# "man:<command>") maps to the sha256 of its text, and every hash to the one
+# file holding it, so mirrors and man aliases share a single file and the
+# pipeline sees each document once. Near-identical documents (SimHash within
+# NEAR_DUP_BITS, at most SIMHASH_BANDS - 1) are flagged with the hash they duplicate.
+# With packing on, documents go into the CorpusPack instead and their path is
+# only a name; read_bytes(), stat() and scan() serve loose and packed
+# documents alike, so workers never need to know where a document lives.
+class DocStore:
+    def __init__(self, path=None, near_dup_bits=NEAR_DUP_BITS, packing=PACK_CORPUS):
+        self.near_dup_bits = max(0, min(near_dup_bits, SIMHASH_BANDS - 1))
+        self.packing = packing
+        self._pack = None
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path or DATA_ROOT / "docs.db", check_same_thread=False)
+        bands = ", ".join(f"b{i} INTEGER" for i in range(SIMHASH_BANDS))
+        self.db.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime REAL, "
+                        f"simhash INTEGER, {bands}, near_dup_of TEXT)")
+        if "packed" not in {row[1] for row in self.db.execute("PRAGMA table_info(blobs)")}:
+            self.db.execute("ALTER TABLE blobs ADD COLUMN packed INTEGER DEFAULT 0")
+        for band in range(SIMHASH_BANDS):
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS blobs_b{band} ON blobs (b{band})")
+        self.db.execute("CREATE INDEX IF NOT EXISTS blobs_path ON blobs (path)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, hash TEXT, path TEXT, "
+                        "updated_at REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS sources_hash ON sources (hash)")
+
+    # Opened on first use: packed documents stay readable with packing off.
+    @property
+    def pack(self):
+        if self._pack is None:
+            self._pack = CorpusPack()
+        return self._pack
+
+    # Path currently holding the document with this hash, if it is intact.
+    def _home(self, digest):
+        row = self.db.execute("SELECT path, size, mtime, packed FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if not row:
+            return None
+        if row[3]:
+            return Path(row[0])
+        try:
+            st = os.stat(row[0])
+        except OSError:
+            return None
+        return Path(row[0]) if (st.st_size, st.st_mtime) == (row[1], row[2]) else None
+
+    def resolve(self, source):
+        with self._lock:
+            row = self.db.execute("SELECT hash FROM sources WHERE source = ?", (source,)).fetchone()
+            return self._home(row[0]) if row else None
+
+    def has(self, source):
+        return self.resolve(source) is not None
+
+    # Before `path` stops holding `digest`, moves the file to another source
+    # of the same document, or forgets the document if it has none.
+    def _evacuate(self, digest, source, path):
+        if self._home(digest) != path:
+            return False
+        packed = self.db.execute("SELECT packed FROM blobs WHERE hash = ?", (digest,)).fetchone()[0]
+        for (other,) in self.db.execute("SELECT path FROM sources WHERE hash = ? AND source != ? AND path != ?",
+                                        (digest, source, str(path))).fetchall():
+            other = Path(other)
+            if not packed:
+                other.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, other)
+            self.db.execute("UPDATE blobs SET path = ? WHERE hash = ?", (str(other), digest))
+            return True
+        self.db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+        if packed:
+            self.pack.delete(digest)
+        return False
+
+    def _register(self, digest, path, sig, packed_size=None):
+        if packed_size is None:
+            st = path.stat()
+            size, mtime = st.st_size, st.st_mtime
+        else:
+            size, mtime = packed_size, time.time()
+        width = 64 // SIMHASH_BANDS
+        bands = [None if sig is None else sig >> (width * i) & ((1 << width) - 1) for i in range(SIMHASH_BANDS)]
+        near = None
+        if sig is not None:
+            # Signatures differing in fewer bits than there are bands agree on
+            # at least one band, so only those rows need comparing.
+            match = " OR ".join(f"b{i} = ?" for i in range(SIMHASH_BANDS))
+            for other, other_sig in self.db.execute(
+                    f"SELECT hash, simhash FROM blobs WHERE hash != ? AND ({match})", (digest, *bands)):
+                if bin((other_sig & (2**64 - 1)) ^ sig).count("1") <= self.near_dup_bits:
+                    near = other
+                    break
+            sig -= (sig >> 63) << 64  # SQLite integers are signed
+        self.db.execute(f"INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, {'?, ' * SIMHASH_BANDS}?, ?)",
+                        (digest, str(path), size, mtime, sig, *bands, near, packed_size is not None))
+
+    # Saves text from `source` as `path` unless some file already holds the
+    # same text. Returns ("saved" | "unchanged" | "duplicate", file holding it).
+    def put(self, source, text, path):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = Path(path)
+        sig = simhash(text) if self.near_dup_bits else None
+        with self._lock:
+            row = self.db.execute("SELECT hash FROM sources WHERE source = ?", (source,)).fetchone()
+            prev = row[0] if row and row[0] != digest else None
+            home = self._home(digest)
+            if home is None:
+                for (other,) in self.db.execute("SELECT hash FROM blobs WHERE path = ?", (str(path),)).fetchall():
+                    self._evacuate(other, source, path)
+                if self.packing:
+                    self.pack.put(digest, data)
+                    # A loose copy of an older version must not shadow it.
+                    path.unlink(missing_ok=True)
+                    self._register(digest, path, sig, packed_size=len(data))
+                else:
+                    tmp = path.with_name(path.name + ".tmp")
+                    tmp.write_bytes(data)
+                    os.replace(tmp, path)
+                    self._register(digest, path, sig)
+                status, home = "saved", path
+            elif home == path:
+                status = "unchanged"
+            else:
+                status = "duplicate"
+                # Don't leave this source's previous text behind in its own file.
+                if prev and self._home(prev) == path and not self._evacuate(prev, source, path):
+                    path.unlink(missing_ok=True)
+            self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                            (source, digest, str(path), time.time()))
+            self.db.commit()
+        return status, home
+
+    def near_duplicates(self):
+        with self._lock:
+            return {Path(row[0]) for row in self.db.execute(
+                "SELECT b.path FROM blobs b JOIN blobs o ON o.hash = b.near_dup_of")}
+
+    # {path: (hash, size, mtime)} of the packed documents.
+    def packed(self):
+        with self._lock:
+            return {Path(p): (h, size, mtime) for p, h, size, mtime in self.db.execute(
+                "SELECT path, hash, size, mtime FROM blobs WHERE packed = 1")}
+
+    def _packed_hash(self, path):
+        with self._lock:
+            row = self.db.execute("SELECT hash FROM blobs WHERE path = ? AND packed = 1", (str(path),)).fetchone()
+        return row[0] if row else None
+
+    # Hash of a packed document, or None for loose files.
+    def packed_digest(self, path):
+        return self._packed_hash(path)
+
+    def read_bytes(self, path):
+        digest = self._packed_hash(path)
+        return self.pack.get(digest) if digest else Path(path).read_bytes()
+
+    # (size, mtime) of a loose or packed document; raises OSError if neither.
+    def stat(self, path):
+        with self._lock:
+            row = self.db.execute("SELECT size, mtime FROM blobs WHERE path = ? AND packed = 1",
+                                  (str(path),)).fetchone()
+        if row:
+            return row[0], row[1]
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+
+    # Yields (path, bytes) for the given paths: loose files in order, then
+    # packed documents in segment order. Unreadable documents are skipped.
+    def scan(self, paths):
+        packed = self.packed()
+        by_hash = {}
+        for path in paths:
+            path = Path(path)
+            if path in packed:
+                by_hash.setdefault(packed[path][0], []).append(path)
+                continue
+            try:
+                yield path, path.read_bytes()
+            except OSError:
+                continue
+        if by_hash:
+            for digest, data in self.pack.scan(by_hash):
+                for path in by_hash[digest]:
+                    yield path, data
+
+    # Moves every loose document the store knows of (and untracked .txt
+    # files given in `extra`) into the packed corpus and removes the files.
+    # Needs a store opened with packing=True.
+    def pack_loose(self, extra=(), progress=_noop, running=_always):
+        with self._lock:
+            loose = self.db.execute("SELECT hash, path FROM blobs WHERE packed = 0").fetchall()
+        moved = 0
+        for digest, path in loose:
+            if not running():
+                break
+            with self._lock:
+                if self._home(digest) != Path(path):
+                    continue
+                data = Path(path).read_bytes()
+                self.pack.put(digest, data)
+                self.db.execute("UPDATE blobs SET packed = 1, size = ?, mtime = ? WHERE hash = ?",
+                                (len(data), time.time(), digest))
+                self.db.commit()
+                Path(path).unlink()
+            moved += 1
+            if moved % 1000 == 0:
+                progress(f"[…] {moved} documents packed")
+        with self._lock:
+            known = {Path(p) for (p,) in self.db.execute("SELECT path FROM blobs")}
+        for path in extra:
+            if not running():
+                break
+            if path in known or not path.is_file():
+                continue
+            status, _ = self.put(f"file:{path}", path.read_bytes().decode("utf-8", errors="ignore"), path)
+            if status == "duplicate":
+                path.unlink(missing_ok=True)
+            moved += 1
+        return moved
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+            if self._pack is not None:
+                self._pack.close()
+
+_doc_store = None
+_doc_store_lock = threading.Lock()
+
+def doc_store():
+    global _doc_store
+    with _doc_store_lock:
+        if _doc_store is None:
+            _doc_store = DocStore()
+        return _doc_store
+
+# File name for a URL: its readable tail plus a hash of the whole URL, so
+# URLs that share their last characters no longer overwrite each other.
+def url_to_name(url):
+    tail = "".join(c if c.isalnum() or c in "._-" else "_" for c in url.rstrip("/")[-40:])
+    return f"{tail}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+# Stores the text fetched from url as path through the document store; a
+# document some other source already saved is not written again.
+def write_output(url, path, text, r):
+    status, home = doc_store().put(url, text, path)
+    if status == "unchanged":
+        return f"[=] Unchanged {home.name}"
+    if status == "duplicate":
+        return f"[=] Duplicate of {home.name}: {url}"
+    return f"[✓] Saved {home.name}" + (" (truncated)" if getattr(r, "truncated", False) else "")
+
+def not_modified(r, url, path):
+    return getattr(r, "not_modified", False) and (path.exists() or doc_store().has(url))
+
+def save_page(url, r):
+    if r.status_code != 200:
+        return f"[✗] HTTP {r.status_code} {url}"
+    out = DATA_ROOT / f"{url_to_name(url)}.txt"
+    if not_modified(r, url, out):
+        return f"[=] Not modified {out.name}"
+    content_type = r.headers.get('content-type', '').lower()
+    if 'text/plain' in content_type or url.endswith('.txt'):
+        text = read_body_text(r)
+    else:
+        text = html_to_text(iter_body(r))
+    return write_output(url, out, text, r)
+
+def run_fetch(urls, progress=None, running=None, done=None):
+    FetchEngine().run([(url, save_page) for url in urls], progress, running, done)
+    return "[✓] Custom fetch done"
+
+def save_as(filename, must_contain=None):
+    def handler(url, r):
+        if r.status_code != 200:
+            return f"[✗] HTTP {r.status_code} {url}"
+        out = DATA_ROOT / filename
+        if not_modified(r, url, out):
+            return f"[=] Not modified {filename}"
+        text = read_body_text(r)
+        if must_contain and must_contain not in text:
+            return f"[✗] Unexpected content from {url}"
+        return write_output(url, out, text, r)
+    return handler
+
+def save_man_html(name):
+    def handler(url, r):
+        if r.status_code != 200:
+            return f"[✗] HTTP {r.status_code} {url}"
+        out = DATA_ROOT / f"{name}_man.txt"
+        if not_modified(r, url, out):
+            return f"[=] Not modified {out.name}"
+        text = html_to_text(iter_body(r), only="pre")
+        if text is None:
+            return f"[✗] No man text in {url}"
+        return write_output(url, out, text, r)
+    return handler
+
+def fetch_gutenberg(progress=None, running=None):
+    FetchEngine().run([("https://www.gutenberg.org/files/1342/1342-0.txt", save_as("gutenberg_pride_prejudice.txt"))],
+                      progress, running)
+
+def fetch_rfcs(progress=None, running=None):
+    jobs = [(f"https://www.rfc-editor.org/rfc/rfc{i}.txt", save_as(f"rfc{i}.txt")) for i in [1, 10, 100, 1000]]
+    FetchEngine(timeout=8).run(jobs, progress, running)
+
+def fetch_manpages(progress=None, running=None):
     pages = ["bash", "ssh", "systemd"]
-    for p in pages:
-        r = requests.get(f"https://man7.org/linux/man-pages/man1/{p}.html", timeout=8)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            pre = soup.find("pre")
-            if pre:
-                (DATA_ROOT / f"{p}_man.txt").write_text(pre.get_text(), encoding="utf-8")
-
-def fetch_gpg():
-    r = requests.get("https://keys.openpgp.org/vks/v1/by-fingerprint/886D5E5E3F3F3F3F3F3F3F3F3F3F3F3F3F3F3F3F", timeout=10)
-    if r.status_code == 200 and "-----BEGIN PGP PUBLIC KEY BLOCK-----" in r.text:
-        (DATA_ROOT / "sample_key.asc").write_text(r.text, encoding="utf-8")
-
-def fetch_all_coding_man():
+    jobs = [(f"https://man7.org/linux/man-pages/man1/{p}.html", save_man_html(p)) for p in pages]
+    FetchEngine(timeout=8).run(jobs, progress, running)
+
+def fetch_gpg(progress=None, running=None):
+    FetchEngine().run([("https://keys.openpgp.org/vks/v1/by-fingerprint/886D5E5E3F3F3F3F3F3F3F3F3F3F3F3F3F3F3F3F",
+                        save_as("sample_key.asc", must_contain="-----BEGIN PGP PUBLIC KEY BLOCK-----"))],
+                      progress, running)
+
+CRAWL_DEPTH = int(os.environ.get("LLMFEED_CRAWL_DEPTH", "3"))
+CRAWL_MAX_PAGES = int(os.environ.get("LLMFEED_CRAWL_MAX_PAGES", "10000"))
+CRAWL_BATCH = 200
+CRAWL_SEEN_CAPACITY = 1_000_000
+CRAWL_SITEMAP_LIMIT = 50
+ROBOTS_TTL = 86400
+SKIP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".css", ".js", ".zip", ".gz", ".tgz",
+                   ".bz2", ".xz", ".tar", ".pdf", ".mp3", ".mp4", ".webm", ".woff", ".woff2", ".ttf", ".exe", ".iso",
+                   ".deb", ".rpm", ".dmg", ".whl")
+
+# Fixed-size Bloom filter (double hashing over blake2b). `in` may rarely say
+# yes for a URL never added, so at worst a crawl skips a page; it never
+# fetches one twice.
+class BloomFilter:
+    def __init__(self, capacity=CRAWL_SEEN_CAPACITY, error_rate=0.001, bits=None, hashes=None, count=0):
+        self.size = bits or max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    # Adds key; returns False if it was (probably) there already.
+    def add(self, key):
+        new = False
+        for p in self._positions(key):
+            if not self.bits[p >> 3] & (1 << (p & 7)):
+                self.bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        self.count += new
+        return new
+
+# Canonical form of a link found on `base`: absolute, no fragment, lower-case
+# scheme and host without default ports. None for non-HTTP or binary links.
+def normalize_url(link, base=None):
+    try:
+        parts = urlsplit(urljoin(base, link.strip()) if base else link.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if port and port != {"http": 80, "https": 443}[scheme]:
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    if path.lower().endswith(SKIP_EXTENSIONS):
+        return None
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+class LinkExtractor(HTMLParser):
+    def __init__(self, base):
+        super().__init__(convert_charrefs=True)
+        self.base = base
+        self.links = []
+        self.nofollow = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "base" and attrs.get("href"):
+            self.base = urljoin(self.base, attrs["href"])
+        elif tag == "meta" and (attrs.get("name") or "").lower() == "robots":
+            self.nofollow = "nofollow" in (attrs.get("content") or "").lower()
+        elif tag == "a" and attrs.get("href") and "nofollow" not in (attrs.get("rel") or "").lower():
+            self.links.append(attrs["href"])
+
+# Page URLs listed in a sitemap or sitemap index (plain or gzipped XML), as
+# ([page urls], [nested sitemap urls]).
+def parse_sitemap(body):
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return [], []
+    locs = [el.text.strip() for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "loc" and el.text]
+    return ([], locs) if root.tag.rsplit("}", 1)[-1] == "sitemapindex" else (locs, [])
+
+# Bounded crawl from seed URLs: pages reachable through sitemaps and links,
+# at most `depth` links from a seed, on the seeds' hosts (or `domains`, which
+# include their subdomains), under `prefixes` (default: each seed's
+# directory), up to max_pages. robots.txt is obeyed and its Crawl-delay
+# slows that host down. The frontier and the Bloom filter of seen URLs live
+# in crawls/<id>.db, so running the same crawl again resumes it.
+class Crawler:
+    def __init__(self, seeds, depth=CRAWL_DEPTH, max_pages=CRAWL_MAX_PAGES, domains=(), prefixes=(),
+                 sitemaps=True, engine=None):
+        self.seeds = [u for u in (normalize_url(s) for s in seeds) if u]
+        if not self.seeds:
+            raise ValueError("no valid http(s) seed URLs")
+        self.depth = depth
+        self.max_pages = max_pages
+        self.domains = sorted({d.lower().lstrip(".") for d in domains} or {urlsplit(u).netloc for u in self.seeds})
+        self.prefixes = sorted(set(prefixes) or {urlsplit(u).path.rsplit("/", 1)[0] + "/" for u in self.seeds})
+        self.sitemaps = sitemaps
+        self.engine = engine or FetchEngine()
+        self.robots = {}
+        key = json.dumps([self.seeds, depth, self.domains, self.prefixes])
+        (DATA_ROOT / "crawls").mkdir(parents=True, exist_ok=True)
+        self.path = DATA_ROOT / "crawls" / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.db"
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS frontier (url TEXT PRIMARY KEY, depth INTEGER, added REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS frontier_depth ON frontier (depth)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER, "
+                        "hashes INTEGER, count INTEGER, bits BLOB)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS robots (host TEXT PRIMARY KEY, body TEXT, fetched REAL)")
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('seeds', ?)", (json.dumps(self.seeds),))
+        row = self.db.execute("SELECT size, hashes, count, bits FROM seen").fetchone()
+        if row:
+            self.seen = BloomFilter(bits=row[0], hashes=row[1], count=row[2])
+            self.seen.bits[:] = row[3]
+        else:
+            self.seen = BloomFilter()
+        # URLs queued after the last save must count as seen too.
+        for (url,) in self.db.execute("SELECT url FROM frontier"):
+            self.seen.add(url)
+        self.db.commit()
+
+    def _meta(self, key, default=0):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _save(self):
+        self.db.execute("INSERT OR REPLACE INTO seen VALUES (0, ?, ?, ?, ?)",
+                        (self.seen.size, self.seen.hashes, self.seen.count, bytes(self.seen.bits)))
+        self.db.commit()
+
+    def in_scope(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc
+        return (any(host == d or host.endswith("." + d) for d in self.domains)
+                and any(parts.path.startswith(p) for p in self.prefixes))
+
+    # Queues in-scope URLs not seen before; returns how many were new.
+    def enqueue(self, urls, depth):
+        if depth > self.depth:
+            return 0
+        rows = [(u, depth, time.time()) for u in urls if u and self.in_scope(u) and self.seen.add(u)]
+        self.db.executemany("INSERT OR IGNORE INTO frontier VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    # Fetches robots.txt for the hosts of urls that have no copy younger than
+    # ROBOTS_TTL in the crawl db. They go through the engine like pages, so
+    # they wait for the host's delay and slots. Missing or unreachable files
+    # allow everything; 401/403 forbid everything.
+    def _load_robots(self, urls, progress=None, running=None):
+        running = running or _always
+        todo = {}
+        for url in urls:
+            parts = urlsplit(url)
+            host = parts.netloc
+            if host in self.robots or host in todo:
+                continue
+            row = self.db.execute("SELECT fetched FROM robots WHERE host = ?", (host,)).fetchone()
+            if not row or time.time() - row[0] >= ROBOTS_TTL:
+                todo[host] = f"{parts.scheme}://{host}/robots.txt"
+        if not todo:
+            return
+        bodies = {}
+        def handler(url, r):
+            bodies[urlsplit(url).netloc] = {401: "User-agent: *\nDisallow: /", 403: "User-agent: *\nDisallow: /"}.get(
+                r.status_code, read_body_text(r) if r.status_code == 200 else "")
+            return f"[✓] robots.txt {url} (HTTP {r.status_code})"
+        self.engine.run([(url, handler) for url in todo.values()], progress, running)
+        for host in todo:
+            if host in bodies or running():
+                self.db.execute("INSERT OR REPLACE INTO robots VALUES (?, ?, ?)",
+                                (host, bodies.get(host, ""), time.time()))
+
+    def robots_for(self, url):
+        host = urlsplit(url).netloc
+        if host in self.robots:
+            return self.robots[host]
+        self._load_robots([url])
+        row = self.db.execute("SELECT body FROM robots WHERE host = ?", (host,)).fetchone()
+        rp = robotparser.RobotFileParser()
+        rp.parse((row[0] if row else "").splitlines())
+        delay = rp.crawl_delay(USER_AGENT)
+        if delay:
+            self.engine.host_delays[host] = float(delay)
+        self.robots[host] = rp
+        return rp
+
+    # Page URLs from the seeds' sitemaps (robots.txt Sitemap: lines, else
+    # /sitemap.xml), following sitemap indexes up to CRAWL_SITEMAP_LIMIT files.
+    def _sitemap_urls(self, progress, running):
+        self._load_robots(self.seeds, progress, running)
+        todo = []
+        for seed in self.seeds:
+            parts = urlsplit(seed)
+            rp = self.robots_for(seed)
+            listed = rp.site_maps() or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+            todo += [u for u in listed if u not in todo]
+        pages, fetched, done = [], 0, set(todo)
+        def handler(url, r):
+            if r.status_code != 200:
+                return f"[✗] Sitemap {url}: HTTP {r.status_code}"
+            body = bytearray()
+            r.truncated = False
+            for chunk in r.iter_content(64 * 1024):
+                body += chunk
+                if len(body) >= MAX_PAGE_BYTES:
+                    r.truncated = True
+                    break
+            try:
+                found, nested = parse_sitemap(bytes(body[:MAX_PAGE_BYTES]))
+            except (OSError, EOFError) as e:
+                return f"[✗] Sitemap {url}: {e}"
+            pages.extend(found)
+            todo.extend(u for u in nested if u not in done)
+            done.update(nested)
+            return f"[✓] Sitemap {url}: {len(found)} pages, {len(nested)} sitemaps"
+        while todo and fetched < CRAWL_SITEMAP_LIMIT and running():
+            batch = todo[:CRAWL_SITEMAP_LIMIT - fetched]
+            del todo[:len(batch)]
+            fetched += len(batch)
+            self.engine.run([(url, handler) for url in batch], progress, running)
+        return pages
+
+    def _handler(self, found):
+        def handler(url, r):
+            if r.status_code != 200:
+                return f"[✗] HTTP {r.status_code} {url}"
+            content_type = r.headers.get("content-type", "").lower()
+            out = DATA_ROOT / f"{url_to_name(url)}.txt"
+            if "text/plain" in content_type:
+                text = read_body_text(r)
+            elif "html" in content_type or not content_type:
+                pieces = list(iter_body(r))
+                links = LinkExtractor(getattr(r, "url", None) or url)
+                for piece in pieces:
+                    links.feed(piece)
+                links.close()
+                if not links.nofollow:
+                    found[url] = [normalize_url(link, links.base) for link in links.links]
+                text = html_to_text(pieces)
+            else:
+                return f"[=] Skipped {content_type.split(';')[0]}: {url}"
+            if not_modified(r, url, out):
+                return f"[=] Not modified {out.name}"
+            return write_output(url, out, text, r)
+        return handler
+
+    def run(self, progress=None, running=None, fresh=False):
+        progress = progress or _noop
+        running = running or _always
+        if fresh:
+            self.db.execute("DELETE FROM frontier")
+            self.db.execute("DELETE FROM meta WHERE key IN ('started', 'pages')")
+            self.db.execute("DELETE FROM seen")
+            self.seen = BloomFilter()
+        if not self._meta("started"):
+            queued = self.enqueue(self.seeds, 0)
+            if self.sitemaps:
+                queued += self.enqueue([normalize_url(u) for u in self._sitemap_urls(progress, running)], 1)
+            if running():
+                self._set_meta("started", time.time())
+            self._save()
+            progress(f"[→] Crawl {self.path.stem}: {queued} URLs queued from {len(self.seeds)} seeds and sitemaps")
+        pages = self._meta("pages")
+        skipped = 0
+        while running() and pages < self.max_pages:
+            batch = self.db.execute("SELECT url, depth FROM frontier ORDER BY depth, added LIMIT ?",
+                                    (min(CRAWL_BATCH, self.max_pages - pages),)).fetchall()
+            if not batch:
+                break
+            depths, jobs, found = dict(batch), [], {}
+            self._load_robots([url for url, _ in batch], progress, running)
+            if not running():
+                break
+            for url, depth in batch:
+                if self.robots_for(url).can_fetch(USER_AGENT, url):
+                    jobs.append((url, self._handler(found)))
+                else:
+                    self.db.execute("DELETE FROM frontier WHERE url = ?", (url,))
+                    skipped += 1
+            def done(url):
+                nonlocal pages
+                pages += 1
+                self.enqueue(found.pop(url, ()), depths[url] + 1)
+                self.db.execute("DELETE FROM frontier WHERE url = ?", (url,))
+            self.engine.run(jobs, progress, running, done)
+            self._set_meta("pages", pages)
+            self._save()
+        left = self.db.execute("SELECT count(*) FROM frontier").fetchone()[0]
+        self._save()
+        state = "complete" if not left else "stopped" if not running() else "page limit reached"
+        return (f"[✓] Crawl {state}: {pages} pages, {left} queued, {skipped} blocked by robots.txt, "
+                f"{self.seen.count} URLs seen")
+
+    def close(self):
+        self.db.close()
+
+def run_crawl(seeds, progress=None, running=None, depth=CRAWL_DEPTH, max_pages=CRAWL_MAX_PAGES, domains=(),
+              prefixes=(), sitemaps=True, fresh=False):
+    crawler = Crawler(seeds, depth, max_pages, domains, prefixes, sitemaps)
+    try:
+        return crawler.run(progress, running, fresh)
+    finally:
+        crawler.close()
+
+MAN_CONCURRENCY = int(os.environ.get("LLMFEED_MAN_CONCURRENCY", str(os.cpu_count() or 4)))
+MAN_SECTION_ORDER = ["1", "8", "6", "5", "7", "3", "2", "4", "9"]
+MAN_COMPRESSION = (".gz", ".bz2", ".xz", ".lzma", ".zst", ".Z")
+
+def man_roots():
+    try:
+        out = subprocess.run(["manpath"], capture_output=True, text=True, timeout=3).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        out = ""
+    roots = out or os.environ.get("MANPATH", "") or "/usr/local/share/man:/usr/share/man"
+    return [r for r in roots.split(":") if os.path.isdir(r)]
+
+# Maps page name -> manual file by listing man*/ directories once, which
+# replaces one `man -w` subprocess per command. Earlier manpath roots win,
+# then sections in MAN_SECTION_ORDER (user commands before admin, etc.).
+def build_man_lookup(roots=None):
+    rank = {sec: i for i, sec in enumerate(MAN_SECTION_ORDER)}
+    best = {}
+    for root_no, root in enumerate(roots if roots is not None else man_roots()):
+        for sect_dir in sorted(Path(root).glob("man*")):
+            if not sect_dir.is_dir():
+                continue
+            for entry in os.scandir(sect_dir):
+                name = entry.name
+                for ext in MAN_COMPRESSION:
+                    if name.endswith(ext):
+                        name = name[:-len(ext)]
+                        break
+                page, _, section = name.rpartition(".")
+                if not page or not section:
+                    continue
+                key = (root_no, rank.get(section[0], len(rank)), section)
+                if page not in best or key < best[page][0]:
+                    best[page] = (key, entry.path)
+    return {page: path for page, (_, path) in best.items()}
+
+# Pages that are not valid UTF-8 (old Latin-1 manuals) are decoded with
+# replacement characters rather than failing the whole harvest.
+def render_man(man_file):
+    env = dict(os.environ, MANWIDTH="80", MANPAGER="cat", PAGER="cat")
+    man_text = subprocess.run(['man', '-l', man_file], capture_output=True, encoding="utf-8", errors="replace",
+                              timeout=10, env=env).stdout
+    return subprocess.run(['col', '-b'], input=man_text, capture_output=True, encoding="utf-8", errors="replace",
+                          timeout=10).stdout
+
+def fetch_all_coding_man(progress=None, running=None):
+    progress = progress or _noop
+    running = running or _always
     out_dir = DATA_ROOT / "man"
     out_dir.mkdir(exist_ok=True)
     paths = os.environ.get("PATH", "").split(":")
@@ -110,458 +2055,1430 @@ def fetch_all_coding_man():
                     commands.add(item)
     common = {"python3", "gcc", "gdb", "make", "git", "curl", "wget", "jq", "vim", "nano", "tmux", "screen", "rsync", "ssh", "scp", "openssl", "nmcli", "ip", "ss", "tcpdump", "htop", "iotop", "lsof", "strace", "journalctl", "dnf", "rpm", "podman", "buildah", "skopeo"}
     commands.update(common)
-    saved = 0
+    lookup = build_man_lookup()
+    store = doc_store()
+    # Aliases (symlinked or identical manual files) are rendered once.
+    groups = {}
+    present = missing = 0
     for cmd in sorted(commands):
-        out_path = out_dir / f"{cmd}.txt"
-        if out_path.exists():
+        if (out_dir / f"{cmd}.txt").exists() or store.has(f"man:{cmd}"):
+            present += 1
+        elif cmd in lookup:
+            groups.setdefault(os.path.realpath(lookup[cmd]), []).append(cmd)
+        else:
+            missing += 1
+    todo = list(groups.items())
+    progress(f"[→] {len(commands)} commands: {sum(len(g) for _, g in todo)} to render ({len(todo)} distinct pages), "
+             f"{present} already saved, {missing} without a manual page")
+
+    def harvest(item):
+        man_file, cmds = item
+        clean_text = render_man(man_file)
+        if not clean_text.strip():
+            return None
+        return [store.put(f"man:{cmd}", clean_text, out_dir / f"{cmd}.txt")[0] for cmd in cmds]
+
+    saved = duplicates = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, MAN_CONCURRENCY)) as pool:
+        futures = [pool.submit(harvest, item) for item in todo]
+        for done_count, fut in enumerate(futures, 1):
+            if not running():
+                pool.shutdown(cancel_futures=True)
+                break
+            try:
+                statuses = fut.result()
+            except (OSError, subprocess.SubprocessError):
+                statuses = None
+            if statuses is None:
+                failed += 1
+            else:
+                saved += statuses.count("saved")
+                duplicates += len(statuses) - statuses.count("saved")
+            if done_count % 100 == 0:
+                progress(f"[…] {done_count}/{len(todo)} rendered ({saved} saved, {duplicates} duplicates, {failed} failed)")
+    progress(f"[✓] Man pages: {saved} saved, {duplicates} duplicates, {present} already present, "
+             f"{missing} without a manual page, {failed} failed")
+
+DERIVED_MARKERS = ("_summary", "_cheatsheet", "_classified_")
+
+# Every document in the corpus: top-level and man/ .txt files plus the
+# documents kept in the packed corpus. Read them with read_document() or
+# doc_store().scan().
+def corpus_files():
+    packed = doc_store().packed()
+    loose = [p for p in [*DATA_ROOT.glob("*.txt"), *(DATA_ROOT / "man").glob("*.txt")] if p not in packed]
+    return sorted([*loose, *packed])
+
+def read_document(path):
+    return doc_store().read_bytes(path).decode("utf-8", errors="ignore")
+
+# Fetched documents only: the corpus minus the files the AI workers write
+# themselves and documents flagged as near-duplicates.
+def source_documents():
+    near = doc_store().near_duplicates()
+    for txt in corpus_files():
+        if not any(m in txt.stem for m in DERIVED_MARKERS) and txt not in near:
+            yield txt
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# Records which pipeline stage has run on which content hash of each file, so
+# workers process exactly the new or changed documents, and each distinct
+# content only once even when several files hold it. Hashes are cached by
+# (size, mtime) so unchanged files are never re-read.
+class Manifest:
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or DATA_ROOT / "manifest.db")
+        self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stages (path TEXT, stage TEXT, hash TEXT, done_at REAL, PRIMARY KEY (path, stage))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS stages_hash ON stages (stage, hash)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS labels (hash TEXT PRIMARY KEY, label TEXT, source TEXT, labeled_at REAL)")
+
+    def digest(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            digest = doc_store().packed_digest(path)
+            if digest is None:
+                raise
+            # Recorded like a loose file so labels() finds packed documents.
+            size, mtime = doc_store().stat(path)
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (str(path), size, mtime, digest))
+            return digest
+        row = self.db.execute("SELECT size, mtime, hash FROM files WHERE path = ?", (str(path),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+        digest = file_digest(path)
+        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (str(path), st.st_size, st.st_mtime, digest))
+        return digest
+
+    def pending(self, stage, paths):
+        todo, queued = [], set()
+        for path in paths:
+            try:
+                digest = self.digest(path)
+            except OSError:
+                continue
+            if digest in queued:
+                continue
+            row = self.db.execute("SELECT hash FROM stages WHERE path = ? AND stage = ?", (str(path), stage)).fetchone()
+            if row and row[0] == digest:
+                continue
+            if self.db.execute("SELECT 1 FROM stages WHERE stage = ? AND hash = ?", (stage, digest)).fetchone():
+                continue
+            queued.add(digest)
+            todo.append((path, digest))
+        self.db.commit()
+        return todo
+
+    def mark(self, stage, path, digest):
+        self.db.execute("INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)", (str(path), stage, digest, time.time()))
+        self.db.commit()
+
+    def set_label(self, digest, label, source):
+        self.db.execute("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)", (digest, label, source, time.time()))
+
+    # (path, label, source) for files whose current content has a label.
+    def labels(self, label=None):
+        sql = "SELECT f.path, l.label, l.source FROM files f JOIN labels l ON l.hash = f.hash"
+        params = ()
+        if label:
+            sql += " WHERE l.label = ?"
+            params = (label,)
+        return self.db.execute(sql + " ORDER BY f.path", params).fetchall()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("LLMFEED_SUMMARY_CHUNK_TOKENS", "1500"))
+SUMMARY_PART_TOKENS = 150
+SUMMARY_TOKENS = 200
+# Section headings: markdown, numbered RFC/manual sections, chapters and
+# all-caps man page headers.
+SECTION_HEADING = re.compile(r"^(?:#{1,6} \S|\d+(?:\.\d+)*\.?\s+[A-Z]|(?:CHAPTER|Chapter|PART|Part)\b|[A-Z][A-Z0-9 ,'()/-]{2,60}$)")
+
+# Packs units into groups of at most max_tokens (and at least min_units).
+# Groups end where the content says, not where the running size does: a unit
+# starts a new group when the hash of its first line (a section heading, say)
+# falls below tokens / max_tokens. An edit then only moves the boundaries up
+# to the next such anchor, so it re-summarizes one or two chunks instead of
+# every chunk after it. Groups are still cut before they outgrow max_tokens.
+def anchored_groups(units, max_tokens, min_units=1):
+    groups, group, size = [], [], 0
+    for unit in units:
+        tokens = approx_tokens(unit)
+        if len(group) >= min_units and (size + tokens > max_tokens or is_anchor(unit, tokens / max_tokens)):
+            groups.append(group)
+            group, size = [], 0
+        group.append(unit)
+        size += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+def is_anchor(unit, chance):
+    first = unit.lstrip().split("\n", 1)[0]
+    return int.from_bytes(hashlib.blake2b(first.encode("utf-8"), digest_size=4).digest(), "big") < chance * 2**32
+
+# Splits text into chunks of at most max_tokens on section boundaries. A
+# section that fits is kept whole; longer ones are split into paragraphs
+# (chunk_text's pieces for paragraphs that do not fit either).
+def section_chunks(text, max_tokens=SUMMARY_CHUNK_TOKENS):
+    sections, current = [], []
+    for line in text.splitlines():
+        if current and SECTION_HEADING.match(line):
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    units = []
+    for section in sections:
+        section = section.strip()
+        if not section:
+            continue
+        if approx_tokens(section) <= max_tokens:
+            units.append(section)
             continue
+        for para in re.split(r"\n\s*\n", section):
+            units.extend(chunk_text(para, max_tokens))
+    return ["\n\n".join(group) for group in anchored_groups(units, max_tokens)]
+
+# Summaries of document chunks and of the combine steps above them, keyed by
+# sha256 of (model, prompt, n_predict), plus which documents use each one.
+# This is what makes re-summarizing incremental, so unlike the response cache
+# it is neither bypassed by LLMFEED_LLM_CACHE=0 nor evicted by size or age:
+# an entry is dropped by prune() once no current document's summary uses it.
+class ChunkSummaries:
+    def __init__(self, path=None):
+        DATA_ROOT.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.db = sqlite3.connect(path or DATA_ROOT / "summaries.db", check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, summary TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS uses (doc TEXT, key TEXT, PRIMARY KEY (doc, key))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS uses_key ON uses (key)")
+
+    @staticmethod
+    def key(model, prompt, n_predict):
+        return hashlib.sha256(json.dumps([model, prompt, n_predict]).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT summary FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    # A new summary is referenced by doc right away, so the parts of a
+    # document that failed half way survive prune() for the retry.
+    def put(self, key, summary, doc):
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?)", (key, summary))
+            self.db.execute("INSERT OR IGNORE INTO uses VALUES (?, ?)", (doc, key))
+            self.db.commit()
+
+    # Records the keys of doc's finished summary, replacing older ones.
+    def use(self, doc, keys):
+        with self._lock:
+            self.db.execute("DELETE FROM uses WHERE doc = ?", (doc,))
+            self.db.executemany("INSERT OR IGNORE INTO uses VALUES (?, ?)", [(doc, k) for k in keys])
+            self.db.commit()
+
+    # Forgets documents not in docs and the summaries nothing uses any more.
+    def prune(self, docs):
+        with self._lock:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS current (doc TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM current")
+            self.db.executemany("INSERT OR IGNORE INTO current VALUES (?)", [(d,) for d in docs])
+            self.db.execute("DELETE FROM uses WHERE doc NOT IN (SELECT doc FROM current)")
+            removed = self.db.execute("DELETE FROM chunks WHERE key NOT IN (SELECT key FROM uses)").rowcount
+            self.db.commit()
+            return removed
+
+    def close(self):
+        with self._lock:
+            self.db.commit()
+            self.db.close()
+
+# Map-reduce summary: every chunk is summarized in parallel, then the partial
+# summaries are packed into prompts of at most SUMMARY_CHUNK_TOKENS and
+# combined, level by level, until one summary is left. With summaries (a
+# ChunkSummaries) and doc, prompts for unchanged chunks are answered from it,
+# else from the response cache. Returns (summary, prompts, prompts answered
+# without the LLM).
+def summarize_document(text, client, running=None, summaries=None, doc=None):
+    chunks = section_chunks(text) or [""]
+    if len(chunks) == 1:
+        prompts = [f"Summarize concisely:\n{chunks[0]}\nSummary:"]
+    else:
+        prompts = [f"Summarize this part of a longer document concisely:\n{c}\nSummary:" for c in chunks]
+    model = client.model("summarize") if summaries is not None else None
+    keys = []
+    calls = cached = 0
+    while True:
+        final = len(prompts) == 1
+        n_predict = SUMMARY_TOKENS if final else SUMMARY_PART_TOKENS
+        parts = [None] * len(prompts)
+        def summarize(job):
+            if summaries is None:
+                return client.complete_cached(job[1], n_predict, task="summarize")
+            key = ChunkSummaries.key(model, job[1], n_predict)
+            summary = summaries.get(key)
+            metrics.inc("cache_requests_total", cache="summaries", result="miss" if summary is None else "hit")
+            if summary is not None:
+                return summary, True
+            summary, hit = client.complete_cached(job[1], n_predict, task="summarize")
+            summaries.put(key, summary, doc)
+            return summary, hit
+        for (i, prompt), (summary, hit), err in client.map(summarize, list(enumerate(prompts)), running=running):
+            if err:
+                raise err
+            parts[i] = summary
+            calls += 1
+            cached += hit
+            if summaries is not None:
+                keys.append(ChunkSummaries.key(model, prompt, n_predict))
+        if None in parts:
+            raise LLMError("Stopped")
+        if final:
+            if summaries is not None:
+                summaries.use(doc, keys)
+            return parts[0], calls, cached
+        groups = anchored_groups(parts, SUMMARY_CHUNK_TOKENS, min_units=2)
+        prompts = [("Combine these partial summaries of one document into a concise summary:\n"
+                    if len(groups) == 1 else
+                    "Combine these partial summaries of consecutive parts of a document concisely:\n")
+                   + "\n\n".join(g) + "\nSummary:" for g in groups]
+
+def run_summarize(progress=None, running=None):
+    progress = progress or _noop
+    client = llm_client()
+    manifest = Manifest()
+    summaries = ChunkSummaries()
+    def summarize(job):
+        txt = job[0]
+        content = read_document(txt)
+        summary, calls, cached = summarize_document(content, client, running, summaries, str(txt))
+        txt.with_name(f"{txt.stem}_summary.txt").write_text(summary, encoding="utf-8")
+        return calls, cached
+    ok = failed = 0
+    docs = list(source_documents())
+    jobs = manifest.pending("summarize", docs)
+    for (txt, digest), counts, err in client.map(summarize, jobs, running=running):
+        if err:
+            failed += 1
+            metrics.error("summarize", err)
+            metrics.inc("stage_items_total", stage="summarize", result="failed")
+            progress(f"[✗] {txt.name}: {err}")
+            continue
+        ok += 1
+        metrics.inc("stage_items_total", stage="summarize", result="ok")
+        manifest.mark("summarize", txt, digest)
+        progress(f"[✓] {txt.name} ({ok + failed}/{len(jobs)}, {counts[0]} prompts, {counts[1]} cached)")
+    if running is None or running():
+        summaries.prune(str(p) for p in docs)
+    summaries.close()
+    manifest.close()
+    return f"[✓] Summaries saved: {ok} ok, {failed} failed"
+
+CLASSIFY_BATCH = int(os.environ.get("LLMFEED_CLASSIFY_BATCH", "8"))
+CLASSIFY_DOC_TOKENS = 300
+CLASSIFY_PREFILTER = os.environ.get("LLMFEED_CLASSIFY_PREFILTER", "1") != "0"
+CLASSIFY_PREFILTER_HITS = 8
+# Label -> keywords for the pre-filter; override with taxonomy.json in the
+# data directory. "other" has no keywords, so only the LLM picks it.
+DEFAULT_TAXONOMY = {
+    "security": ["security", "vulnerability", "exploit", "attack", "malware", "firewall", "selinux", "apparmor",
+                 "audit", "privilege", "authentication", "password", "sudo", "cve", "intrusion", "sandbox"],
+    "networking": ["network", "tcp", "udp", "packet", "route", "routing", "interface", "dns", "dhcp", "socket",
+                   "ethernet", "wifi", "bandwidth", "http", "proxy", "ipv4", "ipv6", "netmask", "gateway"],
+    "crypto": ["encryption", "encrypt", "decrypt", "cipher", "certificate", "tls", "ssl", "gpg", "pgp",
+               "signature", "rsa", "aes", "openssl", "keyring", "hmac", "sha256"],
+    "other": [],
+}
+
+def load_taxonomy(path=None):
+    path = Path(path or DATA_ROOT / "taxonomy.json")
+    try:
+        taxonomy = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return DEFAULT_TAXONOMY
+    if not isinstance(taxonomy, dict) or not taxonomy:
+        raise ValueError(f"{path}: expected an object mapping labels to keyword lists")
+    return {str(label): [str(k).lower() for k in keywords or []] for label, keywords in taxonomy.items()}
+
+# Labels text from keyword counts alone when one label clearly dominates
+# (CLASSIFY_PREFILTER_HITS hits and three times the runner-up), else None.
+def keyword_label(text, taxonomy):
+    counts = Counter(re.findall(r"[a-z0-9]+", text.lower()))
+    scores = sorted(((sum(counts[k] for k in keywords), label) for label, keywords in taxonomy.items()
+                     if keywords), reverse=True)
+    if not scores:
+        return None
+    best = scores[0]
+    runner_up = scores[1][0] if len(scores) > 1 else 0
+    return best[1] if best[0] >= CLASSIFY_PREFILTER_HITS and best[0] >= 3 * runner_up else None
+
+# Classifies several documents with one completion. The reply is constrained
+# by a JSON schema (llama.cpp turns it into a grammar) to an array holding
+# exactly one taxonomy label per document.
+def classify_batch(client, labels, docs):
+    parts = [f"Document {i}:\n{text}" for i, (_, text) in enumerate(docs, 1)]
+    prompt = (f"Classify each document into exactly one of: {', '.join(labels)}.\n\n" + "\n\n".join(parts)
+              + f"\n\nAnswer with a JSON array of {len(docs)} labels, one per document, in order.\nLabels:")
+    schema = {"type": "array", "items": {"type": "string", "enum": labels},
+              "minItems": len(docs), "maxItems": len(docs)}
+    reply = client.complete(prompt, n_predict=8 + 8 * len(docs), task="classify", json_schema=schema, temperature=0)
+    try:
+        result = json.loads(reply)
+    except ValueError:
+        raise LLMError(f"Unparseable classification reply: {reply[:80]!r}")
+    if not isinstance(result, list) or len(result) != len(docs) or any(r not in labels for r in result):
+        raise LLMError(f"Classification reply does not match the schema: {reply[:80]!r}")
+    return result
+
+def run_classify(progress=None, running=None):
+    progress = progress or _noop
+    running = running or _always
+    taxonomy = load_taxonomy()
+    labels = list(taxonomy)
+    client = llm_client()
+    manifest = Manifest()
+    by_keyword = by_llm = failed = 0
+    todo = []
+    for txt, digest in manifest.pending("classify", source_documents()):
+        if not running():
+            break
         try:
-            result = subprocess.run(['man', '-w', cmd], capture_output=True, text=True, timeout=3)
-            if result.returncode == 0 and result.stdout.strip():
-                man_text = subprocess.run(['man', cmd], capture_output=True, text=True, timeout=5).stdout
-                clean_text = subprocess.run(['col', '-b'], input=man_text, capture_output=True, text=True).stdout
-                if clean_text.strip():
-                    out_path.write_text(clean_text, encoding="utf-8")
-                    saved += 1
-        except:
+            text = read_document(txt)
+        except (OSError, ValueError) as e:
+            failed += 1
+            metrics.error("classify", e)
+            metrics.inc("stage_items_total", stage="classify", result="failed")
+            progress(f"[✗] {txt.name}: {e}")
+            continue
+        label = keyword_label(text[:20000], taxonomy) if CLASSIFY_PREFILTER else None
+        if label:
+            manifest.set_label(digest, label, "keywords")
+            manifest.mark("classify", txt, digest)
+            by_keyword += 1
+            metrics.inc("stage_items_total", stage="classify", result="keywords")
             continue
+        todo.append(((txt, digest), text[:CLASSIFY_DOC_TOKENS * CHARS_PER_TOKEN]))
+    if by_keyword:
+        progress(f"[…] {by_keyword} labelled by keywords, {len(todo)} left for the LLM")
+    batches = [todo[i:i + max(1, CLASSIFY_BATCH)] for i in range(0, len(todo), max(1, CLASSIFY_BATCH))]
+    for batch, result, err in client.map(lambda b: classify_batch(client, labels, b), batches, running=running):
+        if err:
+            failed += len(batch)
+            metrics.error("classify", err)
+            metrics.inc("stage_items_total", len(batch), stage="classify", result="failed")
+            progress(f"[✗] {', '.join(job[0].name for job, _ in batch)}: {err}")
+            continue
+        metrics.inc("stage_items_total", len(batch), stage="classify", result="ok")
+        for ((txt, digest), _), label in zip(batch, result):
+            manifest.set_label(digest, label, "llm")
+            manifest.mark("classify", txt, digest)
+            by_llm += 1
+            progress(f"[✓] {txt.name} → {label}")
+    manifest.close()
+    return f"[✓] Files classified: {by_keyword + by_llm} ok ({by_keyword} by keywords), {failed} failed"
 
-# ✅ MODIFIED: Only process files modified in last 5 minutes
-class SummarizeWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self._running = True
-    def run(self):
-        if not self._running:
-            return
-        now = time.time()
-        cutoff = now - 300  # 5 minutes
-        for txt in DATA_ROOT.glob("*.txt"):
-            if not txt.is_file():
+def run_extract_code(progress=None, running=None):
+    running = running or _always
+    code_block = re.compile(r"```(?:\w+)?\s*(.*?)```", re.DOTALL)
+    for txt, data in doc_store().scan(p for p in corpus_files() if p.parent == DATA_ROOT):
+        if not running():
+            break
+        text = data.decode("utf-8", errors="ignore")
+        snippets = code_block.findall(text)
+        if snippets:
+            out = DATA_ROOT / f"{txt.stem}_code.sh"
+            out.write_text("\n\n".join(snippets), encoding="utf-8")
+    return "[✓] Code snippets extracted"
+
+INDEX_BATCH = 500
+INDEX_VERSION = 3
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = int(os.environ.get("LLMFEED_CHUNK_TOKENS", "256"))
+
+def approx_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+# Packs paragraphs into chunks of at most max_tokens; paragraphs that are too
+# big on their own are split by line, and overlong lines by character count.
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    limit = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    def add(piece, sep):
+        nonlocal current
+        if current and len(current) + len(sep) + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+        current = current + sep + piece if current else piece
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if len(para) <= limit:
+            if para:
+                add(para, "\n\n")
+            continue
+        for line in para.splitlines():
+            for i in range(0, len(line), limit):
+                add(line[i:i + limit], "\n")
+    if current:
+        chunks.append(current)
+    return chunks
+
+def open_index(path=None):
+    db = sqlite3.connect(path or DATA_ROOT / "index.db")
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA temp_store=MEMORY")
+    db.execute("PRAGMA cache_size=-65536")
+    if db.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+        # Older layouts stored one row per file or reused chunk ids; rebuild
+        # from scratch once.
+        for table in ("docs", "doc_meta", "chunks"):
+            db.execute(f"DROP TABLE IF EXISTS {table}")
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    # docs holds one row per chunk; chunks maps its rowids back to file order.
+    db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(path, content)")
+    # AUTOINCREMENT: ids are never reused, so the vector index can trust them.
+    db.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, seq INTEGER)")
+    db.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)")
+    db.execute("CREATE TABLE IF NOT EXISTS doc_meta (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)")
+    return db
+
+def drop_indexed(db, paths):
+    rows = [(p,) for p in paths]
+    db.executemany("DELETE FROM docs WHERE rowid IN (SELECT id FROM chunks WHERE path = ?)", rows)
+    db.executemany("DELETE FROM chunks WHERE path = ?", rows)
+    db.executemany("DELETE FROM doc_meta WHERE path = ?", rows)
+
+def index_files():
+    return corpus_files()
+
+# Changed documents are found from (size, mtime) first and then read in one
+# doc_store().scan(), so packed documents stream in segment order.
+def run_index(progress=None, running=None):
+    running = running or _always
+    db = open_index()
+    known = {row[0]: row[1:] for row in db.execute("SELECT path, size, mtime, hash FROM doc_meta")}
+    packed = doc_store().packed()
+    seen, todo, batch, touched = set(), {}, [], []
+    changed = 0
+    for txt in index_files():
+        if not running():
+            break
+        key = str(txt)
+        seen.add(key)
+        try:
+            digest, size, mtime = packed.get(txt) or (None, *doc_store().stat(txt))
+            old = known.get(key)
+            if old and old[0] == size and old[1] == mtime:
                 continue
-            mtime = txt.stat().st_mtime
-            if mtime < cutoff:
-                continue  # Skip old files
-            try:
-                content = txt.read_text(encoding="utf-8", errors="ignore")[:4000]
-                payload = {"prompt": f"Summarize concisely:\n{content}\nSummary:", "n_predict": 200}
-                r = requests.post(LLM_URL, json=payload, timeout=30)
-                summary = r.json().get("content", "").strip()
-                (DATA_ROOT / f"{txt.stem}_summary.txt").write_text(summary, encoding="utf-8")
-            except: pass
-        self.done.emit("[✓] Summaries saved")
-    def stop(self):
-        self._running = False
-
-# ✅ MODIFIED: Only process files modified in last 5 minutes
-class ClassifyWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self._running = True
-    def run(self):
-        if not self._running:
-            return
-        now = time.time()
-        cutoff = now - 300  # 5 minutes
-        categories = ["security", "networking", "crypto"]
-        for txt in DATA_ROOT.glob("*.txt"):
-            if not txt.is_file():
+            digest = digest or file_digest(txt)
+            if old and old[2] == digest:
+                touched.append((size, mtime, key))
                 continue
-            mtime = txt.stat().st_mtime
-            if mtime < cutoff:
-                continue  # Skip old files
+        except OSError:
+            continue
+        todo[txt] = (size, mtime, digest)
+    for txt, data in doc_store().scan(todo):
+        if not running():
+            break
+        batch.append((str(txt), data.decode("utf-8", errors="ignore"), *todo[txt]))
+        if len(batch) >= INDEX_BATCH:
+            changed += write_index_batch(db, batch)
+            batch = []
+    changed += write_index_batch(db, batch)
+    db.executemany("UPDATE doc_meta SET size = ?, mtime = ? WHERE path = ?", touched)
+    removed = [] if not running() else [k for k in known if k not in seen]
+    drop_indexed(db, removed)
+    db.commit()
+    db.close()
+    return (f"[✓] Searchable index updated: {changed} added/changed, {len(removed)} removed, "
+            f"{len(seen) - changed} unchanged")
+
+def write_index_batch(db, batch):
+    if not batch:
+        return 0
+    drop_indexed(db, [b[0] for b in batch])
+    row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'chunks'").fetchone()
+    next_id = max(row[0] if row else 0, db.execute("SELECT max(id) FROM chunks").fetchone()[0] or 0) + 1
+    rows = []
+    for path, content, *_ in batch:
+        for seq, chunk in enumerate(chunk_text(content)):
+            rows.append((next_id, path, seq, chunk))
+            next_id += 1
+    db.executemany("INSERT INTO chunks (id, path, seq) VALUES (?, ?, ?)", [r[:3] for r in rows])
+    db.executemany("INSERT INTO docs (rowid, path, content) VALUES (?, ?, ?)", [(r[0], r[1], r[3]) for r in rows])
+    db.executemany("INSERT INTO doc_meta VALUES (?, ?, ?, ?)", [(b[0], b[2], b[3], b[4]) for b in batch])
+    db.commit()
+    metrics.inc("index_rows_total", len(rows), index="fts")
+    return len(batch)
+
+ASK_CONTEXT_TOKENS = int(os.environ.get("LLMFEED_ASK_CONTEXT_TOKENS", "1500"))
+ASK_TOP_K = int(os.environ.get("LLMFEED_ASK_TOP_K", "8"))
+STOPWORDS = set("the and for are but not you all any can had her was one our out has how its may new now see way who did get let say she too use what when where which with this that from have they will would there their about into your does should could".split())
+
+def fts_query(question):
+    terms = [w for w in re.findall(r"\w+", question.lower()) if len(w) > 2 and w not in STOPWORDS]
+    return " OR ".join(f'"{w}"' for w in dict.fromkeys(terms))
+
+def is_indexed(db, path):
+    row = db.execute("SELECT size, mtime FROM doc_meta WHERE path = ?", (str(path),)).fetchone()
+    if not row:
+        return False
+    return (row[0], row[1]) == doc_store().stat(path)
+
+# Top-k chunks for the question by FTS5 BM25, from one file or the whole
+# corpus, packed into `budget` tokens. A file that is not (or no longer) in
+# the index is chunked into a throwaway in-memory FTS5 table instead.
+def retrieve_context(question, path=None, budget=ASK_CONTEXT_TOKENS, k=ASK_TOP_K):
+    db = open_index()
+    try:
+        if path and not is_indexed(db, path):
+            db.close()
+            db = sqlite3.connect(":memory:")
+            db.execute("CREATE VIRTUAL TABLE docs USING fts5(path, content)")
+            db.execute("CREATE TABLE chunks (id INTEGER PRIMARY KEY, path TEXT, seq INTEGER)")
+            text = read_document(path)
+            for seq, chunk in enumerate(chunk_text(text)):
+                cur = db.execute("INSERT INTO docs (path, content) VALUES (?, ?)", (str(path), chunk))
+                db.execute("INSERT INTO chunks VALUES (?, ?, ?)", (cur.lastrowid, str(path), seq))
+        query = fts_query(question)
+        rows = []
+        if query:
+            # rank is FTS5's built-in bm25() ordering, optimised for LIMIT.
+            sql = "SELECT path, content FROM docs WHERE docs MATCH ?"
+            params = [query]
+            if path:
+                sql += " AND path = ?"
+                params.append(str(path))
+            rows = db.execute(sql + " ORDER BY rank LIMIT ?", (*params, k)).fetchall()
+        if not rows and path:
+            rows = db.execute("SELECT d.path, d.content FROM chunks c JOIN docs d ON d.rowid = c.id "
+                              "WHERE c.path = ? ORDER BY c.seq LIMIT ?", (str(path), k)).fetchall()
+    finally:
+        db.close()
+    picked, used = [], 0
+    for chunk_path, content in rows:
+        cost = approx_tokens(content)
+        if used + cost > budget:
+            continue
+        picked.append((chunk_path, content))
+        used += cost
+    return picked
+
+EMBED_BATCH = int(os.environ.get("LLMFEED_EMBED_BATCH", "32"))
+VECTOR_DTYPE = os.environ.get("LLMFEED_VECTOR_DTYPE", "int8")
+SEARCH_BLOCK = 16384
+SEARCH_THREADS = os.cpu_count() or 1
+SEARCH_CANDIDATES = 50
+RRF_K = 60
+
+# Chunk embeddings for semantic search. Vectors are L2-normalized rows of one
+# memory-mapped matrix (vectors.bin, int8 with a per-row scale in
+# vectors.scale, or float32); vectors.db maps matrix rows to index.db chunk
+# ids and content hashes. sync() follows the index incrementally: rows of
+# deleted chunks are reused, and an edited document only re-embeds chunks
+# whose text changed.
+class VectorIndex:
+    def __init__(self, root=None, dtype=VECTOR_DTYPE):
+        if np is None:
+            raise RuntimeError("numpy is required for semantic search")
+        self.root = Path(root or DATA_ROOT / "vectors")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.root / "vectors.db")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, chunk_id INTEGER UNIQUE, hash TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_hash ON rows (hash)")
+        meta = dict(self.db.execute("SELECT key, value FROM meta"))
+        self.dim = int(meta.get("dim", 0))
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.count = self.db.execute("SELECT coalesce(max(row) + 1, 0) FROM rows").fetchone()[0]
+
+    def _maps(self, mode="r"):
+        shape = (self.count, self.dim)
+        return (np.memmap(self.root / "vectors.bin", dtype=self.dtype, mode=mode, shape=shape),
+                np.memmap(self.root / "vectors.scale", dtype=np.float32, mode=mode, shape=(self.count,)))
+
+    def _write(self, rows, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not self.dim:
+            self.dim = vectors.shape[1]
+            self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                [("dim", str(self.dim)), ("dtype", self.dtype.name)])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"embedding size changed ({self.dim} -> {vectors.shape[1]}); "
+                             f"delete {self.root} to rebuild")
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if self.dtype == np.int8:
+            scale = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+            vectors = np.rint(vectors / scale[:, None]).astype(np.int8)
+        else:
+            scale = np.ones(len(vectors), np.float32)
+        needed = max(rows) + 1
+        if needed > self.count:
+            for name, width in (("vectors.bin", self.dim * self.dtype.itemsize), ("vectors.scale", 4)):
+                with open(self.root / name, "ab") as f:
+                    f.truncate(needed * width)
+            self.count = needed
+        matrix, scales = self._maps("r+")
+        matrix[rows] = vectors
+        scales[rows] = scale
+        matrix.flush()
+        scales.flush()
+        metrics.inc("index_rows_total", len(rows), index="vectors")
+
+    def sync(self, client, progress=_noop, running=_always):
+        index = open_index()
+        live = {cid for (cid,) in index.execute("SELECT id FROM chunks")}
+        have = dict(self.db.execute("SELECT chunk_id, row FROM rows WHERE chunk_id IS NOT NULL"))
+        stale = [(have[cid],) for cid in have if cid not in live]
+        # Detached rows keep their vectors until the end of the sync, so new
+        # chunks with identical text can take them over without embedding.
+        self.db.executemany("UPDATE rows SET chunk_id = NULL WHERE row = ?", stale)
+        missing = sorted(cid for cid in live if cid not in have)
+        todo, reused = [], 0
+        for i in range(0, len(missing), 500):
+            ids = missing[i:i + 500]
+            for cid, content in index.execute(f"SELECT rowid, content FROM docs WHERE rowid IN "
+                                              f"({','.join('?' * len(ids))})", ids):
+                digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                row = self.db.execute("SELECT row FROM rows WHERE hash = ? AND chunk_id IS NULL LIMIT 1",
+                                      (digest,)).fetchone()
+                if row:
+                    self.db.execute("UPDATE rows SET chunk_id = ? WHERE row = ?", (cid, row[0]))
+                    reused += 1
+                else:
+                    todo.append((cid, digest, content))
+        index.close()
+        self.db.commit()
+        free = [row for (row,) in self.db.execute("SELECT row FROM rows WHERE chunk_id IS NULL ORDER BY row DESC")]
+        if todo:
+            progress(f"[→] Embedding {len(todo)} chunks ({reused} reused, {len(stale)} removed)")
+        batches = [todo[i:i + EMBED_BATCH] for i in range(0, len(todo), EMBED_BATCH)]
+        added = failed = 0
+        next_row = self.count
+        for batch, vectors, err in client.map(lambda b: client.embed([c for _, _, c in b]), batches, running=running):
+            if err:
+                failed += len(batch)
+                metrics.error("embed", err)
+                metrics.inc("stage_items_total", len(batch), stage="embed", result="failed")
+                progress(f"[✗] {len(batch)} chunks: {err}")
+                continue
+            rows = []
+            for _ in batch:
+                if free:
+                    rows.append(free.pop())
+                else:
+                    rows.append(next_row)
+                    next_row += 1
+            self._write(rows, vectors)
+            self.db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?)",
+                                [(row, cid, digest) for row, (cid, digest, _) in zip(rows, batch)])
+            self.db.commit()
+            added += len(batch)
+            metrics.inc("stage_items_total", len(batch), stage="embed", result="ok")
+            if added % (EMBED_BATCH * 20) < len(batch):
+                progress(f"[…] {added}/{len(todo)} chunks embedded")
+        if free and self.count:
+            # Rows still unclaimed score zero until they are reused.
+            _, scales = self._maps("r+")
+            scales[free] = 0
+            scales.flush()
+            self.db.executemany("UPDATE rows SET hash = NULL WHERE row = ?", [(r,) for r in free])
+            self.db.commit()
+        return added, reused, len(stale), failed
+
+    # Top-k (chunk_id, cosine) for a query embedding. The matrix is scored in
+    # blocks across SEARCH_THREADS threads (NumPy releases the GIL), each
+    # keeping only its own top k.
+    def search(self, vector, k=SEARCH_CANDIDATES):
+        if not self.count:
+            return []
+        q = np.asarray(vector, dtype=np.float32)
+        if q.shape != (self.dim,):
+            raise ValueError(f"query embedding has {q.size} dimensions, index has {self.dim}")
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        matrix, scales = self._maps()
+        def score(start):
+            block = matrix[start:start + SEARCH_BLOCK]
+            scores = (block.astype(np.float32) if self.dtype != np.float32 else block) @ q
+            scores *= scales[start:start + SEARCH_BLOCK]
+            top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+            return scores[top], top + start
+        with ThreadPoolExecutor(max_workers=SEARCH_THREADS) as pool:
+            parts = list(pool.map(score, range(0, self.count, SEARCH_BLOCK)))
+        scores = np.concatenate([p[0] for p in parts])
+        rows = np.concatenate([p[1] for p in parts])
+        order = np.argsort(-scores)[:k * 2]
+        found = dict(self.db.execute(f"SELECT row, chunk_id FROM rows WHERE chunk_id IS NOT NULL AND row IN "
+                                     f"({','.join('?' * len(order))})", [int(rows[i]) for i in order]))
+        return [(found[int(rows[i])], float(scores[i])) for i in order if int(rows[i]) in found][:k]
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+def run_embed(progress=None, running=None):
+    progress = progress or _noop
+    if np is None:
+        return "[✗] numpy is not installed; semantic search is unavailable"
+    vectors = VectorIndex()
+    try:
+        added, reused, removed, failed = vectors.sync(llm_client(), progress, running)
+    finally:
+        vectors.close()
+    return f"[✓] Embeddings updated: {added} embedded, {reused} reused, {removed} removed, {failed} failed"
+
+# Hybrid search over the index: FTS5 BM25 and embedding cosine rankings
+# merged by reciprocal rank fusion. Returns ([(path, score, chunk)], stats);
+# without numpy, embeddings or an embedding server it is BM25 alone.
+def search(query, k=10):
+    start = time.monotonic()
+    db = open_index()
+    try:
+        match = fts_query(query)
+        bm25 = [cid for (cid,) in db.execute("SELECT rowid FROM docs WHERE docs MATCH ? ORDER BY rank LIMIT ?",
+                                             (match, SEARCH_CANDIDATES))] if match else []
+        semantic, note = [], ""
+        if np is not None and (DATA_ROOT / "vectors" / "vectors.db").exists():
             try:
-                content = txt.read_text(encoding="utf-8", errors="ignore")[:2000]
-                prompt = f"Classify into one of: {', '.join(categories)}. Text: {content}\nCategory:"
-                r = requests.post(LLM_URL, json={"prompt": prompt, "n_predict": 10}, timeout=20)
-                cat = r.json().get("content", "").strip().lower()
-                if cat not in categories: cat = "other"
-                (DATA_ROOT / f"{txt.stem}_classified_{cat}.txt").write_text(content, encoding="utf-8")
-            except: pass
-        self.done.emit("[✓] Files classified")
-    def stop(self):
-        self._running = False
-
-class ExtractCodeWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self._running = True
-    def run(self):
-        if not self._running:
-            return
-        code_block = re.compile(r"```(?:\w+)?\s*(.*?)```", re.DOTALL)
-        for txt in DATA_ROOT.glob("*.txt"):
-            text = txt.read_text(encoding="utf-8", errors="ignore")
-            snippets = code_block.findall(text)
-            if snippets:
-                out = DATA_ROOT / f"{txt.stem}_code.sh"
-                out.write_text("\n\n".join(snippets), encoding="utf-8")
-        self.done.emit("[✓] Code snippets extracted")
-    def stop(self):
-        self._running = False
-
-class IndexWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self._running = True
-    def run(self):
-        if not self._running:
-            return
-        db = sqlite3.connect(DATA_ROOT / "index.db")
-        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(path, content)")
-        db.execute("DELETE FROM docs")
-        for txt in DATA_ROOT.glob("*.txt"):
-            content = txt.read_text(encoding="utf-8", errors="ignore")
-            db.execute("INSERT INTO docs VALUES (?, ?)", (str(txt), content))
-        db.commit()
+                vectors = VectorIndex()
+                try:
+                    query_vector = llm_client().embed([query], priority=PRIORITY_INTERACTIVE)[0]
+                    semantic = [cid for cid, _ in vectors.search(query_vector)]
+                finally:
+                    vectors.close()
+            except (LLMError, ValueError) as e:
+                note = f" · semantic search unavailable: {e}"
+        else:
+            note = " · keyword search only (run Embed)"
+        fused = {}
+        for ranking in (bm25, semantic):
+            for rank, cid in enumerate(ranking):
+                fused[cid] = fused.get(cid, 0.0) + 1 / (RRF_K + rank + 1)
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
+        rows = {} if not top else {cid: (path, content) for cid, path, content in db.execute(
+            f"SELECT rowid, path, content FROM docs WHERE rowid IN ({','.join('?' * len(top))})", top)}
+    finally:
         db.close()
-        self.done.emit("[✓] Searchable index built")
-    def stop(self):
-        self._running = False
-
-class CheatSheetWorker(QThread):
-    done = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self._running = True
-    def run(self):
-        if not self._running:
-            return
-        man_pages = ["dnf", "systemd"]
-        for cmd in man_pages:
+    results = [(rows[cid][0], fused[cid], rows[cid][1]) for cid in top if cid in rows]
+    stats = (f"{len(results)} results · {len(bm25)} keyword / {len(semantic)} semantic candidates · "
+             f"{(time.monotonic() - start) * 1000:.0f} ms{note}")
+    return results, stats
+
+def run_cheatsheets(progress=None, running=None):
+    progress = progress or _noop
+    man_pages = ["dnf", "systemd"]
+    client = llm_client()
+    def cheatsheet(cmd):
+        help_text = subprocess.run([cmd, "--help"], capture_output=True, text=True, timeout=5).stdout
+        prompt = f"Create a concise cheat sheet for '{cmd}' from this help:\n{help_text[:2000]}"
+        sheet, hit = client.complete_cached(prompt, n_predict=300, task="cheatsheet")
+        (DATA_ROOT / f"{cmd}_cheatsheet.txt").write_text(sheet, encoding="utf-8")
+        return hit
+    ok = failed = cached = 0
+    for cmd, hit, err in client.map(cheatsheet, man_pages, running=running):
+        if err:
+            failed += 1
+            metrics.error("cheatsheet", err)
+            metrics.inc("stage_items_total", stage="cheatsheet", result="failed")
+            progress(f"[✗] {cmd}: {err}")
+        else:
+            ok += 1
+            metrics.inc("stage_items_total", stage="cheatsheet", result="ok")
+            cached += hit
+    return f"[✓] Cheat sheets generated: {ok} ok ({cached} from cache), {failed} failed"
+
+ASK_STREAM = os.environ.get("LLMFEED_ASK_STREAM", "1") != "0"
+
+# Answers a question from retrieved context; returns (answer, stats line).
+# With stream=True each piece is passed to on_token as it arrives.
+def ask(question, file_path=None, stream=ASK_STREAM, on_token=None, running=None):
+    on_token = on_token or _noop
+    running = running or _always
+    passages = retrieve_context(question, file_path)
+    content = "\n\n".join(f"[{i}] {Path(p).name}:\n{text}" for i, (p, text) in enumerate(passages, 1))
+    prompt = f"Context:\n{content}\n\nQuestion: {question}\nAnswer:"
+    ctx = f"{len(passages)} passages, ~{sum(approx_tokens(t) for _, t in passages)} context tokens"
+    start = time.monotonic()
+    if not stream:
+        ans = llm_client().complete(prompt, n_predict=400, priority=PRIORITY_INTERACTIVE, task="ask")
+        return ans, f"{ctx} · {time.monotonic() - start:.1f}s total"
+    pieces = []
+    first = None
+    for piece in llm_client().stream(prompt, n_predict=400, priority=PRIORITY_INTERACTIVE, task="ask"):
+        if first is None:
+            first = time.monotonic()
+            piece = piece.lstrip()
+        pieces.append(piece)
+        on_token(piece)
+        if not running():
+            break
+    end = time.monotonic()
+    if first is None:
+        return "", f"{ctx} · no tokens · {end - start:.1f}s total"
+    rate = (len(pieces) - 1) / (end - first) if end > first and len(pieces) > 1 else 0.0
+    return "".join(pieces).strip(), f"{ctx} · TTFT {first - start:.2f}s · {rate:.1f} tok/s · {len(pieces)} tokens"
+
+CATALOG_ROOTS = [Path(p).expanduser() for p in os.environ.get("LLMFEED_CATALOG_ROOTS", "").split(os.pathsep) if p] \
+    or [Path.home(), DATA_ROOT]
+# Directory-name globs (or full-path globs when they contain "/") to skip.
+CATALOG_EXCLUDES = [p for p in os.environ.get("LLMFEED_CATALOG_EXCLUDE", "").split(",") if p] or [
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", "venv", ".venv", "env", ".tox", "site-packages",
+    ".cache", ".npm", ".cargo", ".rustup", ".gradle", ".m2", ".mozilla", ".thunderbird", "Mail", ".var",
+    "snap", "Trash", ".Trash*", "*/.local/lib", "*/.local/share/containers"]
+
+def catalog_excluded(path, name, excludes):
+    return any(fnmatch.fnmatch(path if "/" in pat else name, pat) for pat in excludes)
+
+# Persistent list of *.txt files under the catalog roots. Every directory's
+# mtime is remembered; a directory whose mtime has not changed has the same
+# entries, so a refresh only stats it and re-lists nothing but changed ones.
+# refresh() returns how many directories' file lists changed.
+class FileCatalog:
+    def __init__(self, path=None):
+        self.db = sqlite3.connect(path or DATA_ROOT / "catalog.db")
+        self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS files_dir ON files (dir)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent)")
+
+    # Catalogued files plus the documents kept in the packed corpus.
+    def paths(self):
+        files = [row[0] for row in self.db.execute("SELECT path FROM files ORDER BY path")]
+        packed = [str(p) for p in doc_store().packed()]
+        return sorted({*files, *packed}) if packed else files
+
+    def refresh(self, roots=None, excludes=None, running=None):
+        roots = CATALOG_ROOTS if roots is None else roots
+        excludes = CATALOG_EXCLUDES if excludes is None else excludes
+        running = running or (lambda: True)
+        seen = set()
+        stack = [str(r) for r in roots if os.path.isdir(r)]
+        rescanned = changed = 0
+        while stack:
+            if not running():
+                self.db.commit()
+                return changed
+            d = stack.pop()
+            if d in seen:
+                continue
             try:
-                help_text = subprocess.run([cmd, "--help"], capture_output=True, text=True, timeout=5).stdout
-                prompt = f"Create a concise cheat sheet for '{cmd}' from this help:\n{help_text[:2000]}"
-                payload = {"prompt": prompt, "n_predict": 300}
-                r = requests.post(LLM_URL, json=payload, timeout=30)
-                sheet = r.json().get("content", "").strip()
-                (DATA_ROOT / f"{cmd}_cheatsheet.txt").write_text(sheet, encoding="utf-8")
-            except: pass
-        self.done.emit("[✓] Cheat sheets generated")
-    def stop(self):
-        self._running = False
-
-class AskLLMWorker(QThread):
-    answer_ready = pyqtSignal(str)
-    def __init__(self):
-        super().__init__()
-        self.file_path = None
-        self.question = None
-        self._run_query = False
-
-    def set_query(self, file_path, question):
-        self.file_path = file_path
-        self.question = question
-        self._run_query = True
-
-    def run(self):
-        if not self._run_query:
-            return
+                mtime = os.stat(d).st_mtime
+            except OSError:
+                continue
+            seen.add(d)
+            row = self.db.execute("SELECT mtime FROM dirs WHERE path = ?", (d,)).fetchone()
+            if row and row[0] == mtime:
+                for (sub,) in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (d,)):
+                    if not catalog_excluded(sub, os.path.basename(sub), excludes):
+                        stack.append(sub)
+                continue
+            files, subdirs = [], []
+            try:
+                with os.scandir(d) as it:
+                    for e in it:
+                        try:
+                            if e.is_dir(follow_symlinks=False):
+                                if not catalog_excluded(e.path, e.name, excludes):
+                                    subdirs.append(e.path)
+                            elif e.name.endswith(".txt") and e.is_file():
+                                files.append(e.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            rescanned += 1
+            old = {r[0] for r in self.db.execute("SELECT path FROM files WHERE dir = ?", (d,))}
+            if old != set(files):
+                changed += 1
+                self.db.execute("DELETE FROM files WHERE dir = ?", (d,))
+                self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?)", [(f, d) for f in files])
+            # Only new subdirectories start without an mtime; known ones keep
+            # theirs so the walk below skips them unless they changed too.
+            known = {r[0] for r in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (d,))}
+            for sd in known - set(subdirs):
+                changed += self._forget(sd)
+            self.db.executemany("INSERT INTO dirs VALUES (?, ?, NULL) ON CONFLICT (path) DO UPDATE SET parent = ?",
+                                [(sd, d, d) for sd in subdirs if sd not in known])
+            self.db.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, d))
+            self.db.execute("INSERT OR IGNORE INTO dirs VALUES (?, '', ?)", (d, mtime))
+            stack.extend(subdirs)
+            if rescanned % 200 == 0:
+                self.db.commit()
+        # Completed walk: anything not reached any more has gone away.
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+        self.db.execute("DELETE FROM seen")
+        self.db.executemany("INSERT INTO seen VALUES (?)", [(d,) for d in seen])
+        self.db.execute("DELETE FROM dirs WHERE path NOT IN (SELECT path FROM seen)")
+        changed += self.db.execute("DELETE FROM files WHERE dir NOT IN (SELECT path FROM seen)").rowcount
+        self.db.commit()
+        return changed
+
+    # Drops a vanished directory and everything catalogued below it; returns
+    # the number of files removed.
+    def _forget(self, d):
+        prefix = d + os.sep
+        self.db.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (d, len(prefix), prefix))
+        return self.db.execute("DELETE FROM files WHERE dir = ? OR substr(dir, 1, ?) = ?",
+                               (d, len(prefix), prefix)).rowcount
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+PRESETS = {
+    "gutenberg": fetch_gutenberg,
+    "rfcs": fetch_rfcs,
+    "man": fetch_manpages,
+    "man-all": fetch_all_coding_man,
+    "gpg": fetch_gpg,
+}
+PIPELINE = {
+    "summarize": run_summarize,
+    "classify": run_classify,
+    "extract": run_extract_code,
+    "index": run_index,
+    "embed": run_embed,
+    "cheatsheet": run_cheatsheets,
+}
+
+# Resource each job command needs; jobs of one resource share its limit.
+JOB_RESOURCES = {"fetch": "net", "crawl": "net", "summarize": "llm", "classify": "llm", "cheatsheet": "llm", "embed": "llm",
+                 "index": "cpu", "extract": "cpu"}
+RESOURCE_LIMITS = {
+    "net": int(os.environ.get("LLMFEED_NET_JOBS", "2")),
+    "llm": int(os.environ.get("LLMFEED_LLM_JOBS", "1")),
+    "cpu": int(os.environ.get("LLMFEED_CPU_JOBS", "1")),
+}
+JOB_CHECKPOINT_EVERY = 50
+METRICS_SAVE_EVERY = 15
+
+# Runs one job. Fetch jobs report progress through checkpoint(args) with the
+# presets and URLs still to do, so a resumed job skips what is done; the
+# pipeline stages resume from the manifest and index on their own.
+def run_job(command, args, progress=None, running=None, checkpoint=None):
+    start = time.monotonic()
+    status = "failed"
+    try:
+        result = _run_job(command, args, progress, running, checkpoint)
+        status = "done"
+        return result
+    except Exception as e:
+        metrics.error(command, e)
+        raise
+    finally:
+        elapsed = time.monotonic() - start
+        metrics.observe("stage_seconds", elapsed, stage=command)
+        metrics.event("job", command=command, status=status, seconds=round(elapsed, 3))
+
+def _run_job(command, args, progress=None, running=None, checkpoint=None):
+    running = running or _always
+    checkpoint = checkpoint or _noop
+    if command == "fetch":
+        presets, urls = list(args.get("presets", [])), list(args.get("urls", []))
+        for name in list(presets):
+            if not running():
+                break
+            PRESETS[name](progress, running)
+            if running():
+                presets.remove(name)
+                checkpoint({"presets": presets, "urls": urls})
+        if urls and running():
+            remaining = dict.fromkeys(urls)
+            def fetched(url):
+                remaining.pop(url, None)
+                if len(remaining) % JOB_CHECKPOINT_EVERY == 0:
+                    checkpoint({"presets": presets, "urls": list(remaining)})
+            run_fetch(urls, progress, running, fetched)
+            checkpoint({"presets": presets, "urls": list(remaining)})
+        return "[✓] Fetch done"
+    if command == "crawl":
+        # The crawl keeps its own frontier, so a resumed job simply continues.
+        options = {k: args[k] for k in ("depth", "max_pages", "domains", "prefixes", "sitemaps", "fresh") if k in args}
+        return run_crawl(args.get("seeds", []), progress, running, **options)
+    if command in PIPELINE:
+        return PIPELINE[command](progress, running)
+    raise ValueError(f"Unknown job command: {command}")
+
+# Persistent job queue (jobs.db) shared by the daemon, the CLI and the GUI.
+# Each scheduler claims only its owner's jobs, highest priority first, and
+# only for resources with a free slot. A cancel request is a flag on the row
+# so it also reaches a job running in another process.
+class JobQueue:
+    COLUMNS = {"priority": "INTEGER DEFAULT 0", "resource": "TEXT", "owner": "TEXT DEFAULT 'daemon'",
+               "cancel": "INTEGER DEFAULT 0"}
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path or DATA_ROOT / "jobs.db", timeout=30, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, command TEXT, args TEXT, "
+                        "status TEXT, created REAL, started REAL, finished REAL, result TEXT)")
+        have = {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        for name, decl in self.COLUMNS.items():
+            if name not in have:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+        self.db.commit()
+
+    def submit(self, command, args=None, priority=None, owner="daemon"):
+        resource = JOB_RESOURCES.get(command, "cpu")
+        if priority is None:
+            priority = PRIORITY_NORMAL if resource == "net" else PRIORITY_BULK
+        with self._lock:
+            cur = self.db.execute("INSERT INTO jobs (command, args, status, created, priority, resource, owner) "
+                                  "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                                  (command, json.dumps(args or {}), time.time(), priority, resource, owner))
+            self.db.commit()
+        return cur.lastrowid
+
+    def claim(self, owner="daemon", busy=()):
+        busy = list(busy)
+        with self._lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute(
+                f"SELECT id, command, args FROM jobs WHERE status = 'queued' AND owner = ? "
+                f"AND coalesce(resource, 'cpu') NOT IN ({','.join('?' * len(busy))}) "
+                f"ORDER BY priority DESC, id LIMIT 1", (owner, *busy)).fetchone()
+            if row:
+                self.db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row[0]))
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def checkpoint(self, job_id, args):
+        with self._lock:
+            self.db.execute("UPDATE jobs SET args = ? WHERE id = ?", (json.dumps(args), job_id))
+            self.db.commit()
+
+    def finish(self, job_id, status, result):
+        with self._lock:
+            self.db.execute("UPDATE jobs SET status = ?, finished = ?, result = ?, cancel = 0 WHERE id = ?",
+                            (status, time.time(), result, job_id))
+            self.db.commit()
+
+    # Queued jobs are cancelled at once; running ones are flagged for their
+    # scheduler. Returns False for unknown or finished jobs.
+    def cancel(self, job_id):
+        with self._lock:
+            n = self.db.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                                (time.time(), job_id)).rowcount
+            n += self.db.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = 'running'", (job_id,)).rowcount
+            self.db.commit()
+        return bool(n)
+
+    def cancel_requested(self, owner="daemon"):
+        with self._lock:
+            return {row[0] for row in self.db.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND cancel = 1 AND owner = ?", (owner,))}
+
+    def requeue_stale(self, owner="daemon"):
+        with self._lock:
+            n = self.db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running' "
+                                "AND owner = ?", (owner,)).rowcount
+            self.db.commit()
+        return n
+
+    def recent(self, limit=20, owner=None):
+        sql = "SELECT id, command, args, status, created, finished, result, priority FROM jobs"
+        params = (limit,)
+        if owner:
+            sql += " WHERE owner = ?"
+            params = (owner, limit)
+        with self._lock:
+            return self.db.execute(sql + " ORDER BY id DESC LIMIT ?", params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+# Runs queued jobs of one owner on worker threads, at most RESOURCE_LIMITS
+# jobs per resource at a time. Jobs interrupted by a crash or shutdown are
+# requeued and resume from their checkpoint; cancelled jobs stop at their
+# next running() check. on_progress(job_id, msg) and on_done(job_id,
+# status, result) are called from worker threads.
+class Scheduler:
+    def __init__(self, owner="daemon", limits=None, queue=None, on_progress=None, on_done=None):
+        self.owner = owner
+        self.limits = dict(RESOURCE_LIMITS, **(limits or {}))
+        self.queue = queue or JobQueue()
+        self.on_progress = on_progress or _noop
+        self.on_done = on_done or _noop
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def submit(self, command, args=None, priority=None):
+        job_id = self.queue.submit(command, args, priority, self.owner)
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id):
+        ok = self.queue.cancel(job_id)
+        with self._lock:
+            if job_id in self._active:
+                self._active[job_id][1].set()
+        return ok
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                counts = Counter(resource for resource, _, _ in self._active.values())
+                busy = [r for r, limit in self.limits.items() if counts[r] >= max(1, limit)]
+                job = self.queue.claim(self.owner, busy)
+                if not job:
+                    return
+                job_id, command, args = job
+                cancel = threading.Event()
+                thread = threading.Thread(target=self._run, args=(job_id, command, args, cancel), daemon=True)
+                self._active[job_id] = (JOB_RESOURCES.get(command, "cpu"), cancel, thread)
+            thread.start()
+
+    def _run(self, job_id, command, args, cancel):
+        progress = lambda msg: self.on_progress(job_id, msg)
+        running = lambda: not cancel.is_set() and not self._stopping
+        progress(f"[→] Job {job_id}: {command} {json.dumps(args) if args else ''}".rstrip())
         try:
-            content = Path(self.file_path).read_text(encoding="utf-8", errors="ignore")[:2000]
-            prompt = f"Context:\n{content}\n\nQuestion: {self.question}\nAnswer:"
-            payload = {"prompt": prompt, "n_predict": 400}
-            r = requests.post("http://127.0.0.1:8080/completion", json=payload)
-            ans = r.json().get("content", "").strip()
-            self.answer_ready.emit(ans)
+            result, status = run_job(command, args, progress, running,
+                                     lambda a: self.queue.checkpoint(job_id, a)), "done"
         except Exception as e:
-            self.answer_ready.emit(f"[✗] Error: {str(e)}")
-
-class LLMBotGUI(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("LLM Feed Bot")
-        self.resize(1000, 700)
-        self.setStyleSheet("""
-            QMainWindow { background-color: #1e1e1e; }
-            QTabWidget::pane { border: 0; }
-            QTabBar::tab { background: #2a2a2a; color: #4ade80; padding: 10px; }
-            QTabBar::tab:selected { background: #ff0000; color: white; }
-            QPushButton { background: #333; color: #4ade80; padding: 8px; border: 1px solid #555; }
-            QLineEdit { background: #0d0d0d; color: #4ade80; padding: 5px; }
-            QTextEdit { background: #0d0d0d; color: #4ade80; font-family: monospace; }
-            QComboBox { background: #0d0d0d; color: #4ade80; padding: 5px; }
-        """)
-        font = QFont("Monospace", 11)
-        font.setStyleHint(QFont.StyleHint.TypeWriter)
-        self.setFont(font)
-
-        central = QWidget()
-        layout = QVBoxLayout()
-
-        toolbar = QHBoxLayout()
-        self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("Paste URL...")
-        self.confirm_btn = QPushButton("✅ Add URL")
-        self.scrape_btn = QPushButton("🔍 Scrape URLs")
-        self.confirm_btn.clicked.connect(self.add_url)
-        self.scrape_btn.clicked.connect(self.start_web_fetch)
-        toolbar.addWidget(self.url_input)
-        toolbar.addWidget(self.confirm_btn)
-        toolbar.addWidget(self.scrape_btn)
-        layout.addLayout(toolbar)
-
-        self.tabs = QTabWidget()
-
-        welcome_tab = QWidget()
-        welcome_layout = QVBoxLayout()
-        welcome_text = QTextEdit()
-        welcome_text.setReadOnly(True)
-        welcome_text.setPlainText(
-            "✨ Welcome to LLM Feed Bot ✨\n\n"
-            "This tool builds a private, offline knowledge base for your local LLM.\n\n"
-            "TABS:\n"
-            "• 🌐 Custom URL — Add any webpage or .txt URL (HTML auto-converted to clean text)\n"
-            "• 📚 Gutenberg — Fetch public domain books\n"
-            "• 📜 RFCs — Get internet standards (RFCs)\n"
-            "• 📘 Man Pages — Download Linux command docs\n"
-            "  → Includes “Fetch Core Man” (bash, ssh, systemd)\n"
-            "  → NEW: “📥 Fetch All Coding Man” gets man pages for ALL CLI tools on your system\n"
-            "• 🔐 GPG Keys — Retrieve public keys\n"
-            "• 📝 Summarize — Auto-summarize .txt files *(requires LLM server)*\n"
-            "• 💻 Extract Code — Pull executable snippets *(requires LLM server)*\n"
-            "• 🔍 Build Index — Create full-text search DB *(requires LLM server)*\n"
-            "•  cheatsheet — Generate CLI references *(requires LLM server)*\n"
-            "• 🗂️ Classify — Auto-tag files by topic *(requires LLM server)*\n"
-            "• ❓ Ask LLM — Query any .txt file with your local LLM *(requires LLM server)*\n\n"
-            "All data stays on your machine. No telemetry. No cloud.\n\n"
-            "⚠️ LLM SERVER REQUIRED FOR AI FEATURES:\n"
-            "Start your LLM server at http://127.0.0.1:8080 before using AI tabs.\n\n"
-            "💡 IMPORTANT: Operations like Summarize, Classify, etc. ONLY affect files\n"
-            "modified in the last 5 minutes — to avoid reprocessing old data,\n"
-            "reduce RAM usage, and prevent cache overload."
-        )
-        welcome_layout.addWidget(welcome_text)
-        welcome_tab.setLayout(welcome_layout)
-        self.tabs.addTab(welcome_tab, "🎉 Welcome")
-
-        custom_tab = QWidget()
-        custom_layout = QVBoxLayout()
-
-        top_row = QHBoxLayout()
-        top_left = QLabel("🤖")
-        top_left.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        top_left.setStyleSheet("color: #4ade80; font-size: 24px;")
-        top_right = QLabel("⚙️")
-        top_right.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight)
-        top_right.setStyleSheet("color: #4ade80; font-size: 24px;")
-        top_row.addWidget(top_left)
-        top_row.addStretch()
-        top_row.addWidget(top_right)
-
-        self.custom_log = QTextEdit()
-        self.custom_log.setReadOnly(True)
-        self.custom_log.setMinimumHeight(300)
-
-        bottom_row = QHBoxLayout()
-        bottom_left = QLabel("🧠")
-        bottom_left.setAlignment(Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignLeft)
-        bottom_left.setStyleSheet("color: #4ade80; font-size: 24px;")
-        bottom_right = QLabel("⚡")
-        bottom_right.setAlignment(Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignRight)
-        bottom_right.setStyleSheet("color: #4ade80; font-size: 24px;")
-        bottom_row.addWidget(bottom_left)
-        bottom_row.addStretch()
-        bottom_row.addWidget(bottom_right)
-
-        custom_layout.addLayout(top_row)
-        custom_layout.addWidget(self.custom_log)
-        custom_layout.addLayout(bottom_row)
-        custom_tab.setLayout(custom_layout)
-        self.tabs.addTab(custom_tab, "🌐 Custom URL")
-
-        self.create_preset_tab("📚 Gutenberg", "Fetch Book", fetch_gutenberg)
-        self.create_preset_tab("📜 RFCs", "Fetch RFCs", fetch_rfcs)
-
-        man_tab = QWidget()
-        man_layout = QVBoxLayout()
-        btn_core = QPushButton("Fetch Core Man (bash, ssh, systemd)")
-        btn_all = QPushButton("📥 Fetch All Coding Man")
-        log = QTextEdit()
-        log.setReadOnly(True)
-
-        def run_core():
-            btn_core.setEnabled(False)
-            w = PresetWorker(fetch_manpages)
-            w.done.connect(lambda m: self.update_log(log, m, btn_core))
-            w.start()
-            setattr(self, 'worker_man_core', w)
-
-        def run_all():
-            btn_all.setEnabled(False)
-            w = PresetWorker(fetch_all_coding_man)
-            w.done.connect(lambda m: self.update_log(log, m, btn_all))
-            w.start()
-            setattr(self, 'worker_man_all', w)
-
-        btn_core.clicked.connect(run_core)
-        btn_all.clicked.connect(run_all)
-        man_layout.addWidget(btn_core)
-        man_layout.addWidget(btn_all)
-        man_layout.addWidget(log)
-        man_tab.setLayout(man_layout)
-        self.tabs.addTab(man_tab, "📘 Man Pages")
-
-        self.create_preset_tab("🔐 GPG Keys", "Fetch Key", fetch_gpg)
-        self.create_worker_tab("📝 Summarize", "Run Summarization", SummarizeWorker)
-        self.create_worker_tab("💻 Extract Code", "Extract Snippets", ExtractCodeWorker)
-        self.create_worker_tab("🔍 Build Index", "Create Search Index", IndexWorker)
-        self.create_worker_tab(" cheatsheet", "Generate Cheat Sheets", CheatSheetWorker)
-        self.create_worker_tab("🗂️ Classify", "Auto-Classify", ClassifyWorker)
-
-        ask_tab = QWidget()
-        ask_layout = QVBoxLayout()
-        self.file_combo = QComboBox()
-        self.prompt_input = QLineEdit()
-        self.prompt_input.setPlaceholderText("Type your question and press Enter...")
-        self.ask_output = QTextEdit()
-        self.ask_output.setReadOnly(True)
-        self.ask_output.setMaximumHeight(300)
-        self.ask_output.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.ask_output.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.prompt_input.returnPressed.connect(self.send_ask_query)
-        ask_layout.addWidget(QLabel("Select context file:"))
-        ask_layout.addWidget(self.file_combo)
-        ask_layout.addWidget(QLabel("Your question:"))
-        ask_layout.addWidget(self.prompt_input)
-        ask_layout.addWidget(self.ask_output)
-        ask_tab.setLayout(ask_layout)
-        self.tabs.addTab(ask_tab, "❓ Ask LLM")
-        self.update_file_list()
-
-        layout.addWidget(self.tabs)
-        central.setLayout(layout)
-        self.setCentralWidget(central)
-        self.worker = None
-        self.urls = []
-        self.ask_worker = AskLLMWorker()
-        self.ask_worker.answer_ready.connect(self.handle_ask_answer)
-
-    def update_file_list(self):
-        self.file_combo.clear()
-        paths_to_scan = [Path.home(), DATA_ROOT]
-        seen = set()
-        for root in paths_to_scan:
-            for f in root.rglob("*.txt"):
-                if f.is_file():
-                    try:
-                        if str(f).startswith(str(Path.home())):
-                            display = f.relative_to(Path.home())
-                            full_path = f
-                        else:
-                            display = f.relative_to(DATA_ROOT)
-                            full_path = f
-                        key = str(full_path.resolve())
-                        if key not in seen:
-                            seen.add(key)
-                            self.file_combo.addItem(str(display), str(full_path))
-                    except Exception:
-                        continue
-
-    def create_preset_tab(self, name, btn_text, func):
-        widget = QWidget()
-        layout = QVBoxLayout()
-        btn = QPushButton(btn_text)
-        log = QTextEdit()
-        log.setReadOnly(True)
-        def run():
-            btn.setEnabled(False)
-            w = PresetWorker(func)
-            w.done.connect(lambda m: self.update_log(log, m, btn))
-            w.start()
-            setattr(self, f"worker_{name}", w)
-        btn.clicked.connect(run)
-        layout.addWidget(btn)
-        layout.addWidget(log)
-        widget.setLayout(layout)
-        self.tabs.addTab(widget, name)
-
-    def create_worker_tab(self, name, btn_text, WorkerClass):
-        widget = QWidget()
-        layout = QVBoxLayout()
-        btn = QPushButton(btn_text)
-        log = QTextEdit()
-        log.setReadOnly(True)
-        def run():
-            btn.setEnabled(False)
-            w = WorkerClass()
-            w.done.connect(lambda m: self.update_log(log, m, btn))
-            w.start()
-            setattr(self, f"worker_{name}", w)
-        btn.clicked.connect(run)
-        layout.addWidget(btn)
-        layout.addWidget(log)
-        widget.setLayout(layout)
-        self.tabs.addTab(widget, name)
-
-    def update_log(self, log, msg, btn):
-        log.append(f"[{time.strftime('%H:%M:%S')}] {msg}")
-        btn.setEnabled(True)
-
-    def add_url(self):
-        url = self.url_input.text().strip()
-        if url:
-            self.urls.append(url)
-            self.custom_log.append(f"[+] Added: {url}")
-            self.url_input.clear()
-
-    def start_web_fetch(self):
-        if not self.urls:
-            QMessageBox.warning(self, "No URLs", "Add at least one URL first.")
-            return
-        self.worker = WebWorker(self.urls)
-        self.worker.progress.connect(lambda m: self.custom_log.append(m))
-        self.worker.finished.connect(lambda: self.custom_log.append("[✓] Custom fetch done"))
-        self.worker.finished.connect(lambda: self.urls.clear())
-        self.worker.start()
-
-    def send_ask_query(self):
-        if self.file_combo.count() == 0:
-            self.ask_output.append("[!] No .txt files found.")
-            return
-        question = self.prompt_input.text().strip()
-        if not question:
-            self.ask_output.append("[!] Please enter a question.")
-            return
-        file_path = self.file_combo.currentData()
-        self.ask_output.append(f"\n[You] {question}")
-        self.prompt_input.clear()
-        self.ask_worker.set_query(file_path, question)
-        self.ask_worker.start()
-
-    def handle_ask_answer(self, answer):
-        self.ask_output.append(f"[LLM] {answer}\n")
-        self.ask_output.verticalScrollBar().setValue(self.ask_output.verticalScrollBar().maximum())
-
-    def closeEvent(self, event):
-        workers = []
-        for attr in dir(self):
-            obj = getattr(self, attr)
-            if isinstance(obj, QThread) and attr.startswith('worker_'):
-                workers.append(obj)
-        if hasattr(self, 'worker') and self.worker:
-            workers.append(self.worker)
-        if hasattr(self, 'ask_worker') and self.ask_worker.isRunning():
-            workers.append(self.ask_worker)
-        for w in workers:
-            w.stop()
-            w.wait(2000)
-        event.accept()
-
-def main():
-    app = QApplication(sys.argv)
-    app.setStyle("Fusion")
-    dark_palette = app.palette()
-    dark_palette.setColor(app.palette().ColorRole.Window, Qt.GlobalColor.black)
-    dark_palette.setColor(app.palette().ColorRole.WindowText, Qt.GlobalColor.green)
-    app.setPalette(dark_palette)
-    window = LLMBotGUI()
-    window.show()
-    sys.exit(app.exec())
+            result, status = f"[✗] Failed: {str(e)}", "failed"
+        if cancel.is_set():
+            result, status = f"[✗] Cancelled: {result}", "cancelled"
+        elif self._stopping:
+            # Cut short by shutdown: back to the queue, resumed on restart.
+            status = "queued"
+        self.queue.finish(job_id, status, result)
+        with self._lock:
+            self._active.pop(job_id, None)
+        self.on_done(job_id, status, result)
+        self._wake.set()
+
+    def active(self):
+        with self._lock:
+            return list(self._active)
+
+    def run(self, poll=2.0, running=None):
+        running = running or _always
+        requeued = self.queue.requeue_stale(self.owner)
+        while running() and not self._stopping:
+            self._dispatch()
+            for job_id in self.queue.cancel_requested(self.owner):
+                with self._lock:
+                    if job_id in self._active:
+                        self._active[job_id][1].set()
+            self._wake.wait(min(poll, 1.0))
+            self._wake.clear()
+        self.stop()
+        return requeued
+
+    def stop(self, timeout=10.0):
+        self._stopping = True
+        self._wake.set()
+        with self._lock:
+            threads = [t for _, _, t in self._active.values()]
+        deadline = time.monotonic() + timeout
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+def run_daemon(poll=2.0, progress=None, running=None):
+    progress = progress or _noop
+    def done(job_id, status, result):
+        if status != "queued":
+            progress(f"[{'✓' if status == 'done' else '✗'}] Job {job_id}: {result}")
+    scheduler = Scheduler("daemon", on_progress=lambda job_id, msg: progress(msg), on_done=done)
+    progress(f"[→] Daemon watching {DATA_ROOT / 'jobs.db'} (limits: "
+             f"{', '.join(f'{r} {n}' for r, n in scheduler.limits.items())})")
+    # Metrics are saved every METRICS_SAVE_EVERY seconds for scraping.
+    saved = [time.monotonic()]
+    def running_and_save():
+        if time.monotonic() - saved[0] >= METRICS_SAVE_EVERY:
+            metrics.save()
+            saved[0] = time.monotonic()
+        return (running or _always)()
+    requeued = scheduler.run(poll, running_and_save)
+    metrics.save()
+    return f"[✓] Daemon stopped ({requeued} interrupted jobs were resumed)"
+
+def cli_progress(msg):
+    print(msg, flush=True)
+
+def add_crawl_arguments(p):
+    p.add_argument("--depth", type=int, default=CRAWL_DEPTH, help=f"link depth from the seeds (default {CRAWL_DEPTH})")
+    p.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES,
+                   help=f"stop after this many pages (default {CRAWL_MAX_PAGES})")
+    p.add_argument("--domain", action="append", default=[], dest="domains",
+                   help="allowed domain, subdomains included (default: the seeds' hosts)")
+    p.add_argument("--prefix", action="append", default=[], dest="prefixes",
+                   help="allowed path prefix (default: each seed's directory)")
+    p.add_argument("--no-sitemap", action="store_false", dest="sitemaps", help="don't read sitemap.xml")
+
+def crawl_options(args):
+    return {"depth": args.depth, "max_pages": args.max_pages, "domains": args.domains,
+            "prefixes": args.prefixes, "sitemaps": args.sitemaps}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="llm_bot.py", description="LLM Feed Bot: offline knowledge ingestion "
+                                     "for local LLMs. Without a command the GUI is started.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("gui", help="start the desktop GUI (default)")
+    p = sub.add_parser("fetch", help="fetch URLs and/or presets into the data directory")
+    p.add_argument("urls", nargs="*", help="URLs to fetch")
+    p.add_argument("--preset", action="append", default=[], choices=sorted(PRESETS), dest="presets")
+    p.add_argument("--url-file", type=argparse.FileType("r"), help="file with one URL per line ('-' for stdin)")
+    for name, help_text in [("summarize", "summarize new or changed documents"),
+                            ("classify", "classify new or changed documents"),
+                            ("extract", "extract fenced code snippets"),
+                            ("index", "update the full-text search index"),
+                            ("embed", "update chunk embeddings for semantic search"),
+                            ("cheatsheet", "generate CLI cheat sheets")]:
+        sub.add_parser(name, help=help_text)
+    p = sub.add_parser("ask", help="ask the LLM a question")
+    p.add_argument("question")
+    p.add_argument("--file", help="answer from this file (default: whole indexed corpus)")
+    p.add_argument("--no-stream", action="store_true", help="wait for the whole answer")
+    p = sub.add_parser("search", help="hybrid keyword + semantic search over the index")
+    p.add_argument("query")
+    p.add_argument("-k", type=int, default=10, help="number of results (default 10)")
+    p = sub.add_parser("daemon", help="run queued jobs until stopped")
+    p.add_argument("--poll", type=float, default=2.0, help="seconds between queue checks (default 2)")
+    p = sub.add_parser("crawl", help="crawl a site from seed URLs (sitemaps + same-site links)")
+    p.add_argument("urls", nargs="+", help="seed URLs")
+    add_crawl_arguments(p)
+    p.add_argument("--restart", action="store_true", help="forget this crawl's progress and start over")
+    p = sub.add_parser("submit", help="queue a job for the daemon")
+    p.add_argument("job", choices=["fetch", "crawl", *PIPELINE])
+    p.add_argument("urls", nargs="*", help="URLs (fetch) or seed URLs (crawl)")
+    p.add_argument("--preset", action="append", default=[], choices=sorted(PRESETS), dest="presets")
+    add_crawl_arguments(p)
+    p.add_argument("--priority", type=int, help=f"higher runs first (default {PRIORITY_NORMAL} for fetch, "
+                                                f"{PRIORITY_BULK} for LLM/CPU stages)")
+    sub.add_parser("jobs", help="list recent daemon jobs")
+    p = sub.add_parser("metrics", help="show the metrics saved by the last command or the daemon")
+    p.add_argument("--format", choices=["text", "prometheus", "json"], default="text")
+    p = sub.add_parser("cancel", help="cancel a queued or running daemon job")
+    p.add_argument("job_id", type=int)
+    p = sub.add_parser("cache", help="show or clear the LLM response cache")
+    p.add_argument("--clear", action="store_true", help="delete all cached responses")
+    p = sub.add_parser("pack", help="move loose documents into the packed corpus (or compact it)")
+    p.add_argument("--compact", action="store_true", help="rewrite segments that are mostly dead records")
+    p.add_argument("--stats", action="store_true", help="only show the packed corpus size")
+    sub.add_parser("backends", help="check the configured LLM servers")
+    p = sub.add_parser("labels", help="list document classification labels")
+    p.add_argument("--label", help="only documents with this label")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in (None, "gui"):
+        # Let the GUI module share this module's state even when run as a script.
+        sys.modules.setdefault("llm_bot", sys.modules[__name__])
+        import llm_bot_gui
+        return llm_bot_gui.main()
+    ensure_data_root()
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    running = lambda: not stop.is_set()
+    if args.command == "fetch":
+        urls = list(args.urls)
+        if args.url_file:
+            urls += [line.strip() for line in args.url_file if line.strip() and not line.startswith("#")]
+        print(run_job("fetch", {"urls": urls, "presets": args.presets}, cli_progress, running))
+    elif args.command == "crawl":
+        print(run_job("crawl", {"seeds": args.urls, "fresh": args.restart, **crawl_options(args)}, cli_progress, running))
+    elif args.command in PIPELINE:
+        print(run_job(args.command, {}, cli_progress, running))
+    elif args.command == "ask":
+        def on_token(piece):
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+        answer, stats = ask(args.question, args.file, stream=not args.no_stream, on_token=on_token, running=running)
+        print("" if not args.no_stream else answer)
+        print(f"[⏱] {stats}", file=sys.stderr)
+    elif args.command == "search":
+        results, stats = search(args.query, args.k)
+        for path, score, chunk in results:
+            print(f"{score:.4f}  {path}\n        {' '.join(chunk.split())[:160]}")
+        print(f"[⏱] {stats}", file=sys.stderr)
+    elif args.command == "daemon":
+        print(run_daemon(args.poll, cli_progress, running))
+    elif args.command == "submit":
+        job_args = {"urls": args.urls, "presets": args.presets} if args.job == "fetch" else {}
+        if args.job == "crawl":
+            job_args = {"seeds": args.urls, **crawl_options(args)}
+        print(f"[+] Queued job {JobQueue().submit(args.job, job_args, args.priority)}: {args.job}")
+    elif args.command == "jobs":
+        for job_id, command, job_args, status, created, finished, result, priority in JobQueue().recent():
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+            print(f"{job_id:>5}  {status:<9} p{priority if priority is not None else 0:<3} {when}  {command} "
+                  f"{job_args if job_args != '{}' else ''}  {result or ''}")
+    elif args.command == "cancel":
+        ok = JobQueue().cancel(args.job_id)
+        print(f"[{'✓' if ok else '✗'}] Job {args.job_id}: {'cancel requested' if ok else 'not queued or running'}")
+        return 0 if ok else 1
+    elif args.command == "metrics":
+        try:
+            snapshot = json.loads((DATA_ROOT / "metrics.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            print("[✗] No metrics saved yet; run a command or the daemon first")
+            return 1
+        if args.format == "json":
+            print(json.dumps(snapshot, indent=1))
+        elif args.format == "prometheus":
+            print(prometheus_text(snapshot), end="")
+        else:
+            print(metrics_report(snapshot))
+        return 0
+    elif args.command == "cache":
+        cache = ResponseCache()
+        if args.clear:
+            cache.clear()
+        st = cache.stats()
+        print(f"{st['entries']} cached responses, {st['bytes'] / 1e6:.1f} MB, {st['stored_hits']} hits served "
+              f"(limits {LLM_CACHE_MAX_BYTES / 1e6:.0f} MB, {LLM_CACHE_DAYS:g} days"
+              f"{'' if LLM_CACHE else ', disabled by LLMFEED_LLM_CACHE=0'})")
+        cache.close()
+    elif args.command == "pack":
+        store = doc_store()
+        if args.compact:
+            segments, freed = store.pack.compact(running=running)
+            print(f"[✓] Compacted {segments} segments, {freed / 1e6:.1f} MB freed")
+        elif not args.stats:
+            store.packing = True
+            loose = [p for p in corpus_files() if not any(m in p.stem for m in DERIVED_MARKERS) and p.is_file()]
+            print(f"[✓] {store.pack_loose(loose, cli_progress, running)} documents packed")
+        st = store.pack.stats()
+        print(f"{st['records']} documents, {st['raw_bytes'] / 1e6:.1f} MB of text in {st['disk_bytes'] / 1e6:.1f} MB "
+              f"({st['segments']} segments, {st['codec']}), "
+              f"{(st['disk_bytes'] - st['live_bytes']) / 1e6:.1f} MB reclaimable with --compact")
+    elif args.command == "backends":
+        statuses = llm_client().pool.check()
+        for b in statuses:
+            print(f"[{'✓' if b['up'] else '✗'}] {b['url']:<32} {b['parallel']} slots  "
+                  f"{', '.join(b['tasks']) or 'any task':<24} {b['model']}".rstrip())
+        return 0 if any(b["up"] for b in statuses) else 1
+    elif args.command == "labels":
+        manifest = Manifest()
+        for path, label, source in manifest.labels(args.label):
+            print(f"{label:<12} {source:<8} {path}")
+        manifest.close()
+    if args.command in ("fetch", "crawl", "ask", "search", *PIPELINE):
+        metrics.save()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+from pathlib import Path
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QLineEdit, QTextEdit, QTabWidget, QMessageBox, QLabel, QCheckBox, QListView, QSpinBox
+)
+from PyQt6.QtCore import Qt, QThread, QTimer, QStringListModel, QSortFilterProxyModel, pyqtSignal
+from PyQt6.QtGui import QFont, QTextCursor
+from llm_bot import (
+    ASK_STREAM, CRAWL_DEPTH, DATA_ROOT, FileCatalog, Scheduler, ask, ensure_data_root, metrics, metrics_report, search,
+)
+
+# Runs the GUI's job scheduler (fetch presets, pipeline stages) off the GUI
+# thread. Jobs are queued in jobs.db under owner "gui", so a job cut short by
+# closing the window resumes from its checkpoint on the next start.
+class SchedulerWorker(QThread):
+    progress = pyqtSignal(int, str)
+    done = pyqtSignal(int, str, str)
+    def __init__(self):
+        super().__init__()
+        self.scheduler = Scheduler("gui", on_progress=self.progress.emit, on_done=self.done.emit)
+        self._running = True
+    def run(self):
+        self.scheduler.run(poll=1.0, running=lambda: self._running)
+    def stop(self):
+        self._running = False
+        self.scheduler.stop()
+
+class AskLLMWorker(QThread):
+    token = pyqtSignal(str)
+    answer_ready = pyqtSignal(str)
+    stats = pyqtSignal(str)
+    def __init__(self):
+        super().__init__()
+        self.file_path = None
+        self.question = None
+        self.stream = ASK_STREAM
+        self._run_query = False
+
+    def set_query(self, file_path, question):
+        self.file_path = file_path
+        self.question = question
+        self._run_query = True
+
+    def run(self):
+        if not self._run_query:
+            return
+        try:
+            answer, stats = ask(self.question, self.file_path, stream=self.stream, on_token=self.token.emit,
+                                running=lambda: self._run_query)
+            self.answer_ready.emit(answer)
+            self.stats.emit(stats)
+        except Exception as e:
+            self.answer_ready.emit(f"[✗] Error: {str(e)}")
+        finally:
+            self._run_query = False
+
+    def stop(self):
+        self._run_query = False
+
+class SearchWorker(QThread):
+    results = pyqtSignal(list, str)
+    def __init__(self, query):
+        super().__init__()
+        self.query = query
+    def run(self):
+        try:
+            results, stats = search(self.query)
+            self.results.emit(results, stats)
+        except Exception as e:
+            self.results.emit([], f"[✗] Error: {str(e)}")
+    def stop(self):
+        pass
+
+class CatalogWorker(QThread):
+    loaded = pyqtSignal(list)
+    done = pyqtSignal(str)
+    def __init__(self):
+        super().__init__()
+        self._running = True
+    def run(self):
+        catalog = FileCatalog()
+        self.loaded.emit(catalog.paths())
+        if self._running and catalog.refresh(running=lambda: self._running):
+            self.loaded.emit(catalog.paths())
+        count = catalog.db.execute("SELECT count(*) FROM files").fetchone()[0]
+        catalog.close()
+        self.done.emit(f"[✓] {count} .txt files in catalog")
+    def stop(self):
+        self._running = False
+
+class LLMBotGUI(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("LLM Feed Bot")
+        self.resize(1000, 700)
+        self.setStyleSheet("""
+            QMainWindow { background-color: #1e1e1e; }
+            QTabWidget::pane { border: 0; }
+            QTabBar::tab { background: #2a2a2a; color: #4ade80; padding: 10px; }
+            QTabBar::tab:selected { background: #ff0000; color: white; }
+            QPushButton { background: #333; color: #4ade80; padding: 8px; border: 1px solid #555; }
+            QLineEdit { background: #0d0d0d; color: #4ade80; padding: 5px; }
+            QTextEdit { background: #0d0d0d; color: #4ade80; font-family: monospace; }
+            QListView { background: #0d0d0d; color: #4ade80; }
+        """)
+        font = QFont("Monospace", 11)
+        font.setStyleHint(QFont.StyleHint.TypeWriter)
+        self.setFont(font)
+
+        central = QWidget()
+        layout = QVBoxLayout()
+
+        toolbar = QHBoxLayout()
+        self.url_input = QLineEdit()
+        self.url_input.setPlaceholderText("Paste URL...")
+        self.confirm_btn = QPushButton("✅ Add URL")
+        self.scrape_btn = QPushButton("🔍 Scrape URLs")
+        self.confirm_btn.clicked.connect(self.add_url)
+        self.scrape_btn.clicked.connect(self.start_web_fetch)
+        self.crawl_btn = QPushButton("🕸 Crawl")
+        self.crawl_btn.clicked.connect(self.start_crawl)
+        self.crawl_depth = QSpinBox()
+        self.crawl_depth.setRange(0, 10)
+        self.crawl_depth.setValue(CRAWL_DEPTH)
+        self.crawl_depth.setPrefix("depth ")
+        toolbar.addWidget(self.url_input)
+        toolbar.addWidget(self.confirm_btn)
+        toolbar.addWidget(self.scrape_btn)
+        toolbar.addWidget(self.crawl_btn)
+        toolbar.addWidget(self.crawl_depth)
+        layout.addLayout(toolbar)
+
+        self.tabs = QTabWidget()
+
+        welcome_tab = QWidget()
+        welcome_layout = QVBoxLayout()
+        welcome_text = QTextEdit()
+        welcome_text.setReadOnly(True)
+        welcome_text.setPlainText(
+            "✨ Welcome to LLM Feed Bot ✨\n\n"
+            "This tool builds a private, offline knowledge base for your local LLM.\n\n"
+            "TABS:\n"
+            "• 🌐 Custom URL — Add any webpage or .txt URL (HTML auto-converted to clean text)\n"
+            "  → “🕸 Crawl” follows links from the added URLs (same site and path, robots.txt, sitemaps)\n"
+            "• 📚 Gutenberg — Fetch public domain books\n"
+            "• 📜 RFCs — Get internet standards (RFCs)\n"
+            "• 📘 Man Pages — Download Linux command docs\n"
+            "  → Includes “Fetch Core Man” (bash, ssh, systemd)\n"
+            "  → NEW: “📥 Fetch All Coding Man” gets man pages for ALL CLI tools on your system\n"
+            "• 🔐 GPG Keys — Retrieve public keys\n"
+            "• 📝 Summarize — Auto-summarize .txt files *(requires LLM server)*\n"
+            "• 💻 Extract Code — Pull executable snippets *(requires LLM server)*\n"
+            "• 🔍 Build Index — Create full-text search DB *(requires LLM server)*\n"
+            "•  cheatsheet — Generate CLI references *(requires LLM server)*\n"
+            "• 🗂️ Classify — Auto-tag files by topic *(requires LLM server)*\n"
+            "• 🔎 Search — Keyword + semantic search over the index *(embeddings need LLM server)*\n"
+            "• 🧾 Jobs — Queued, running and finished jobs; cancel any of them\n"
+            "• 📊 Metrics — Live fetch/LLM/index counters, timings and errors; Prometheus export\n"
+            "• ❓ Ask LLM — Query any .txt file with your local LLM *(requires LLM server)*\n\n"
+            "All data stays on your machine. No telemetry. No cloud.\n\n"
+            "⚠️ LLM SERVER REQUIRED FOR AI FEATURES:\n"
+            "Start your LLM server at http://127.0.0.1:8080 before using AI tabs\n"
+            "(or list several servers in backends.json in the data directory).\n\n"
+            "💡 Summarize and Classify remember what they already processed\n"
+            "(manifest.db, keyed by content hash) — each run only handles new or\n"
+            "changed files, whatever their age.\n\n"
+            "💡 Fetches and AI stages run as queued jobs: a few at a time per resource\n"
+            "(network, LLM, CPU), Ask always goes first, and unfinished jobs resume\n"
+            "where they stopped the next time the window opens."
+        )
+        welcome_layout.addWidget(welcome_text)
+        welcome_tab.setLayout(welcome_layout)
+        self.tabs.addTab(welcome_tab, "🎉 Welcome")
+
+        custom_tab = QWidget()
+        custom_layout = QVBoxLayout()
+
+        top_row = QHBoxLayout()
+        top_left = QLabel("🤖")
+        top_left.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        top_left.setStyleSheet("color: #4ade80; font-size: 24px;")
+        top_right = QLabel("⚙️")
+        top_right.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight)
+        top_right.setStyleSheet("color: #4ade80; font-size: 24px;")
+        top_row.addWidget(top_left)
+        top_row.addStretch()
+        top_row.addWidget(top_right)
+
+        self.custom_log = QTextEdit()
+        self.custom_log.setReadOnly(True)
+        self.custom_log.setMinimumHeight(300)
+
+        bottom_row = QHBoxLayout()
+        bottom_left = QLabel("🧠")
+        bottom_left.setAlignment(Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignLeft)
+        bottom_left.setStyleSheet("color: #4ade80; font-size: 24px;")
+        bottom_right = QLabel("⚡")
+        bottom_right.setAlignment(Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignRight)
+        bottom_right.setStyleSheet("color: #4ade80; font-size: 24px;")
+        bottom_row.addWidget(bottom_left)
+        bottom_row.addStretch()
+        bottom_row.addWidget(bottom_right)
+
+        custom_cancel = QPushButton("Cancel")
+        custom_cancel.clicked.connect(lambda: self.cancel_jobs(self.custom_log))
+        custom_layout.addLayout(top_row)
+        custom_layout.addWidget(custom_cancel)
+        custom_layout.addWidget(self.custom_log)
+        custom_layout.addLayout(bottom_row)
+        custom_tab.setLayout(custom_layout)
+        self.tabs.addTab(custom_tab, "🌐 Custom URL")
+
+        self.create_preset_tab("📚 Gutenberg", "Fetch Book", "gutenberg")
+        self.create_preset_tab("📜 RFCs", "Fetch RFCs", "rfcs")
+
+        man_tab = QWidget()
+        man_layout = QVBoxLayout()
+        btn_core = QPushButton("Fetch Core Man (bash, ssh, systemd)")
+        btn_all = QPushButton("📥 Fetch All Coding Man")
+        btn_cancel = QPushButton("Cancel")
+        log = QTextEdit()
+        log.setReadOnly(True)
+
+        btn_core.clicked.connect(lambda: self.submit_job("fetch", {"presets": ["man"]}, log, btn_core))
+        btn_all.clicked.connect(lambda: self.submit_job("fetch", {"presets": ["man-all"]}, log, btn_all))
+        btn_cancel.clicked.connect(lambda: self.cancel_jobs(log))
+        man_layout.addWidget(btn_core)
+        man_layout.addWidget(btn_all)
+        man_layout.addWidget(btn_cancel)
+        man_layout.addWidget(log)
+        man_tab.setLayout(man_layout)
+        self.tabs.addTab(man_tab, "📘 Man Pages")
+
+        self.create_preset_tab("🔐 GPG Keys", "Fetch Key", "gpg")
+        self.create_worker_tab("📝 Summarize", "Run Summarization", "summarize")
+        self.create_worker_tab("💻 Extract Code", "Extract Snippets", "extract")
+        self.create_worker_tab("🔍 Build Index", "Create Search Index", "index")
+        self.create_worker_tab(" cheatsheet", "Generate Cheat Sheets", "cheatsheet")
+        self.create_worker_tab("🗂️ Classify", "Auto-Classify", "classify")
+
+        search_tab = QWidget()
+        search_layout = QVBoxLayout()
+        search_row = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search the index and press Enter...")
+        self.search_input.returnPressed.connect(self.run_search)
+        embed_btn = QPushButton("Update Embeddings")
+        search_row.addWidget(self.search_input)
+        search_row.addWidget(embed_btn)
+        self.search_output = QTextEdit()
+        self.search_output.setReadOnly(True)
+        embed_btn.clicked.connect(lambda: self.submit_job("embed", {}, self.search_output, embed_btn))
+        search_layout.addLayout(search_row)
+        search_layout.addWidget(self.search_output)
+        search_tab.setLayout(search_layout)
+        self.tabs.addTab(search_tab, "🔎 Search")
+
+        ask_tab = QWidget()
+        ask_layout = QVBoxLayout()
+        self.file_filter = QLineEdit()
+        self.file_filter.setPlaceholderText("Filter files... (type to search)")
+        self.file_model = QStringListModel()
+        self.file_proxy = QSortFilterProxyModel()
+        self.file_proxy.setSourceModel(self.file_model)
+        self.file_proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.file_view = QListView()
+        self.file_view.setModel(self.file_proxy)
+        self.file_view.setUniformItemSizes(True)
+        self.file_view.setMaximumHeight(180)
+        self.file_filter_timer = QTimer(self)
+        self.file_filter_timer.setSingleShot(True)
+        self.file_filter_timer.setInterval(150)
+        self.file_filter_timer.timeout.connect(lambda: self.file_proxy.setFilterFixedString(self.file_filter.text()))
+        self.file_filter.textChanged.connect(lambda _: self.file_filter_timer.start())
+        self.catalog_status = QLabel("Scanning for .txt files...")
+        rescan_btn = QPushButton("↻ Rescan")
+        rescan_btn.clicked.connect(self.update_file_list)
+        self.prompt_input = QLineEdit()
+        self.prompt_input.setPlaceholderText("Type your question and press Enter...")
+        self.ask_output = QTextEdit()
+        self.ask_output.setReadOnly(True)
+        self.ask_output.setMaximumHeight(300)
+        self.ask_output.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.ask_output.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.stream_check = QCheckBox("Stream tokens as they arrive")
+        self.stream_check.setChecked(ASK_STREAM)
+        self.corpus_check = QCheckBox("Search whole corpus (uses the Build Index database)")
+        self.prompt_input.returnPressed.connect(self.send_ask_query)
+        file_row = QHBoxLayout()
+        file_row.addWidget(QLabel("Select context file:"))
+        file_row.addWidget(self.catalog_status)
+        file_row.addStretch()
+        file_row.addWidget(rescan_btn)
+        ask_layout.addLayout(file_row)
+        ask_layout.addWidget(self.file_filter)
+        ask_layout.addWidget(self.file_view)
+        ask_layout.addWidget(QLabel("Your question:"))
+        ask_layout.addWidget(self.prompt_input)
+        ask_layout.addWidget(self.corpus_check)
+        ask_layout.addWidget(self.stream_check)
+        ask_layout.addWidget(self.ask_output)
+        ask_tab.setLayout(ask_layout)
+        self.tabs.addTab(ask_tab, "❓ Ask LLM")
+        self.update_file_list()
+
+        jobs_tab = QWidget()
+        jobs_layout = QVBoxLayout()
+        jobs_row = QHBoxLayout()
+        self.job_id_input = QLineEdit()
+        self.job_id_input.setPlaceholderText("Job ID to cancel...")
+        self.job_id_input.returnPressed.connect(self.cancel_job_by_id)
+        job_cancel_btn = QPushButton("Cancel Job")
+        job_cancel_btn.clicked.connect(self.cancel_job_by_id)
+        jobs_row.addWidget(self.job_id_input)
+        jobs_row.addWidget(job_cancel_btn)
+        self.jobs_view = QTextEdit()
+        self.jobs_view.setReadOnly(True)
+        self.jobs_log = QTextEdit()
+        self.jobs_log.setReadOnly(True)
+        self.jobs_log.setMaximumHeight(180)
+        jobs_layout.addLayout(jobs_row)
+        jobs_layout.addWidget(self.jobs_view)
+        jobs_layout.addWidget(QLabel("Resumed jobs:"))
+        jobs_layout.addWidget(self.jobs_log)
+        jobs_tab.setLayout(jobs_layout)
+        self.tabs.addTab(jobs_tab, "🧾 Jobs")
+
+        metrics_tab = QWidget()
+        metrics_layout = QVBoxLayout()
+        metrics_row = QHBoxLayout()
+        export_btn = QPushButton("Export (Prometheus + JSON)")
+        export_btn.clicked.connect(self.export_metrics)
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(metrics.reset)
+        self.trace_check = QCheckBox("Trace to trace.jsonl")
+        self.trace_check.setChecked(metrics.tracing)
+        self.trace_check.toggled.connect(
+            lambda on: metrics.trace_to(DATA_ROOT / "trace.jsonl" if on else None))
+        metrics_row.addWidget(export_btn)
+        metrics_row.addWidget(reset_btn)
+        metrics_row.addWidget(self.trace_check)
+        metrics_row.addStretch()
+        self.metrics_status = QLabel("")
+        self.metrics_view = QTextEdit()
+        self.metrics_view.setReadOnly(True)
+        self.metrics_view.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        metrics_layout.addLayout(metrics_row)
+        metrics_layout.addWidget(self.metrics_status)
+        metrics_layout.addWidget(self.metrics_view)
+        metrics_tab.setLayout(metrics_layout)
+        self.tabs.addTab(metrics_tab, "📊 Metrics")
+
+        layout.addWidget(self.tabs)
+        central.setLayout(layout)
+        self.setCentralWidget(central)
+        self.ask_streamed = False
+        self.urls = []
+        self.ask_worker = AskLLMWorker()
+        self.ask_worker.token.connect(self.handle_ask_token)
+        self.ask_worker.answer_ready.connect(self.handle_ask_answer)
+        self.ask_worker.stats.connect(self.handle_ask_stats)
+        self.job_logs = {}
+        self.scheduler_worker = SchedulerWorker()
+        self.scheduler_worker.progress.connect(self.handle_job_progress)
+        self.scheduler_worker.done.connect(self.handle_job_done)
+        self.scheduler_worker.start()
+        self.jobs_timer = QTimer(self)
+        self.jobs_timer.setInterval(2000)
+        self.jobs_timer.timeout.connect(self.refresh_jobs)
+        self.jobs_timer.start()
+        self.refresh_jobs()
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start()
+
+    def update_file_list(self):
+        w = getattr(self, "worker_catalog", None)
+        if w and w.isRunning():
+            return
+        w = CatalogWorker()
+        w.loaded.connect(self.set_file_list)
+        w.done.connect(self.catalog_status.setText)
+        w.start()
+        self.worker_catalog = w
+
+    def set_file_list(self, paths):
+        current = self.selected_file()
+        home = str(Path.home())
+        self.file_model.setStringList(["~" + p[len(home):] if p.startswith(home + os.sep) else p for p in paths])
+        self.catalog_status.setText(f"{len(paths)} files")
+        if current:
+            self.select_file(current)
+        elif self.file_proxy.rowCount():
+            self.file_view.setCurrentIndex(self.file_proxy.index(0, 0))
+
+    def selected_file(self):
+        index = self.file_view.currentIndex()
+        if not index.isValid():
+            return None
+        display = index.data()
+        return str(Path.home()) + display[1:] if display.startswith("~") else display
+
+    def select_file(self, path):
+        home = str(Path.home())
+        display = "~" + path[len(home):] if path.startswith(home + os.sep) else path
+        matches = self.file_proxy.match(self.file_proxy.index(0, 0), Qt.ItemDataRole.DisplayRole, display, 1,
+                                        Qt.MatchFlag.MatchExactly)
+        if matches:
+            self.file_view.setCurrentIndex(matches[0])
+
+    def run_search(self):
+        query = self.search_input.text().strip()
+        w = getattr(self, "worker_search", None)
+        if not query or (w and w.isRunning()):
+            return
+        self.search_output.clear()
+        self.search_output.append(f"[?] {query}")
+        w = SearchWorker(query)
+        w.results.connect(self.show_search_results)
+        w.start()
+        self.worker_search = w
+
+    def show_search_results(self, results, stats):
+        for path, score, chunk in results:
+            self.search_output.append(f"\n{score:.4f}  {path}\n    {' '.join(chunk.split())[:300]}")
+        self.search_output.append(f"\n[⏱] {stats}")
+
+    def create_preset_tab(self, name, btn_text, preset):
+        self.create_job_tab(name, btn_text, "fetch", {"presets": [preset]})
+
+    def create_worker_tab(self, name, btn_text, command):
+        self.create_job_tab(name, btn_text, command, {})
+
+    def create_job_tab(self, name, btn_text, command, args):
+        widget = QWidget()
+        layout = QVBoxLayout()
+        btn = QPushButton(btn_text)
+        cancel = QPushButton("Cancel")
+        log = QTextEdit()
+        log.setReadOnly(True)
+        btn.clicked.connect(lambda: self.submit_job(command, args, log, btn))
+        cancel.clicked.connect(lambda: self.cancel_jobs(log))
+        row = QHBoxLayout()
+        row.addWidget(btn)
+        row.addWidget(cancel)
+        layout.addLayout(row)
+        layout.addWidget(log)
+        widget.setLayout(layout)
+        self.tabs.addTab(widget, name)
+
+    def submit_job(self, command, args, log, btn):
+        btn.setEnabled(False)
+        job_id = self.scheduler_worker.scheduler.submit(command, args)
+        self.job_logs[job_id] = (log, btn)
+        log.append(f"[+] Queued job {job_id}: {command}")
+        self.refresh_jobs()
+        return job_id
+
+    def cancel_jobs(self, log):
+        for job_id, (job_log, _) in list(self.job_logs.items()):
+            if job_log is log and self.scheduler_worker.scheduler.cancel(job_id):
+                log.append(f"[!] Cancelling job {job_id}...")
+
+    def cancel_job_by_id(self):
+        text = self.job_id_input.text().strip()
+        if not text.isdigit():
+            return
+        job_id = int(text)
+        ok = self.scheduler_worker.scheduler.cancel(job_id)
+        self.jobs_log.append(f"[{'!' if ok else '✗'}] Job {job_id}: {'cancel requested' if ok else 'not queued or running'}")
+        self.job_id_input.clear()
+        self.refresh_jobs()
+
+    # Jobs resumed from a previous session have no tab; they log to the Jobs tab.
+    def handle_job_progress(self, job_id, msg):
+        self.job_logs.get(job_id, (self.jobs_log, None))[0].append(msg)
+
+    def handle_job_done(self, job_id, status, result):
+        log, btn = self.job_logs.pop(job_id, (self.jobs_log, None))
+        if status == "queued":
+            return
+        if btn and not any(b is btn for _, b in self.job_logs.values()):
+            self.update_log(log, result, btn)
+        else:
+            log.append(f"[{time.strftime('%H:%M:%S')}] {result}")
+        self.refresh_jobs()
+
+    def refresh_jobs(self):
+        rows = []
+        for job_id, command, args, status, created, finished, result, priority in \
+                self.scheduler_worker.scheduler.queue.recent(30):
+            when = time.strftime("%H:%M:%S", time.localtime(created))
+            rows.append(f"{job_id:>5}  {status:<9} p{priority or 0:<3} {when}  {command} "
+                        f"{args if args != '{}' else ''}  {result or ''}")
+        text = "\n".join(rows) or "No jobs yet."
+        if text != self.jobs_view.toPlainText():
+            self.jobs_view.setPlainText(text)
+
+    def update_log(self, log, msg, btn):
+        log.append(f"[{time.strftime('%H:%M:%S')}] {msg}")
+        btn.setEnabled(True)
+
+    def refresh_metrics(self):
+        if self.tabs.currentWidget() is not self.metrics_view.parentWidget():
+            return
+        text = metrics_report(metrics.snapshot())
+        if text != self.metrics_view.toPlainText():
+            bar = self.metrics_view.verticalScrollBar()
+            pos = bar.value()
+            self.metrics_view.setPlainText(text)
+            bar.setValue(pos)
+
+    def export_metrics(self):
+        try:
+            path = metrics.save()
+            self.metrics_status.setText(f"[✓] Saved {path} and {path.with_suffix('.json')}")
+        except OSError as e:
+            self.metrics_status.setText(f"[✗] Export failed: {e}")
+
+    def add_url(self):
+        url = self.url_input.text().strip()
+        if url:
+            self.urls.append(url)
+            self.custom_log.append(f"[+] Added: {url}")
+            self.url_input.clear()
+
+    def start_web_fetch(self):
+        if not self.urls:
+            QMessageBox.warning(self, "No URLs", "Add at least one URL first.")
+            return
+        self.submit_job("fetch", {"urls": list(self.urls)}, self.custom_log, self.scrape_btn)
+        self.urls.clear()
+
+    def start_crawl(self):
+        if not self.urls:
+            QMessageBox.warning(self, "No URLs", "Add at least one seed URL first.")
+            return
+        args = {"seeds": list(self.urls), "depth": self.crawl_depth.value()}
+        self.submit_job("crawl", args, self.custom_log, self.crawl_btn)
+        self.urls.clear()
+
+    def send_ask_query(self):
+        file_path = None if self.corpus_check.isChecked() else self.selected_file()
+        if file_path is None and not self.corpus_check.isChecked():
+            self.ask_output.append("[!] Select a .txt file first (or tick Search whole corpus).")
+            return
+        question = self.prompt_input.text().strip()
+        if not question:
+            self.ask_output.append("[!] Please enter a question.")
+            return
+        if self.ask_worker.isRunning():
+            self.ask_output.append("[!] Still answering the previous question.")
+            return
+        self.ask_output.append(f"\n[You] {question}")
+        self.ask_output.append("[LLM] ")
+        self.ask_streamed = False
+        self.prompt_input.clear()
+        self.ask_worker.stream = self.stream_check.isChecked()
+        self.ask_worker.set_query(file_path, question)
+        self.ask_worker.start()
+
+    def insert_ask_text(self, text):
+        cursor = self.ask_output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        self.ask_output.verticalScrollBar().setValue(self.ask_output.verticalScrollBar().maximum())
+
+    def handle_ask_token(self, piece):
+        self.ask_streamed = True
+        self.insert_ask_text(piece)
+
+    def handle_ask_answer(self, answer):
+        if answer.startswith("[✗]"):
+            self.ask_output.append(f"{answer}\n")
+        elif not self.ask_streamed:
+            self.insert_ask_text(answer)
+
+    def handle_ask_stats(self, stats):
+        self.ask_output.append(f"[⏱] {stats}\n")
+        self.ask_output.verticalScrollBar().setValue(self.ask_output.verticalScrollBar().maximum())
+
+    def closeEvent(self, event):
+        workers = []
+        for attr in dir(self):
+            obj = getattr(self, attr)
+            if isinstance(obj, QThread) and attr.startswith('worker_'):
+                workers.append(obj)
+        if hasattr(self, 'scheduler_worker'):
+            self.jobs_timer.stop()
+            self.metrics_timer.stop()
+            workers.append(self.scheduler_worker)
+        if hasattr(self, 'ask_worker') and self.ask_worker.isRunning():
+            workers.append(self.ask_worker)
+        for w in workers:
+            w.stop()
+            w.wait(2000)
+        event.accept()
+
+def main():
+    ensure_data_root()
+    app = QApplication(sys.argv)
+    app.setStyle("Fusion")
+    dark_palette = app.palette()
+    dark_palette.setColor(app.palette().ColorRole.Window, Qt.GlobalColor.black)
+    dark_palette.setColor(app.palette().ColorRole.WindowText, Qt.GlobalColor.green)
+    app.setPalette(dark_palette)
+    window = LLMBotGUI()
+    window.show()
+    return app.exec()
+
+if __name__ == "__main__":
+    sys.exit(main())